@@ -1,11 +1,19 @@
 import uuid
 import json
-from fastapi import FastAPI, HTTPException
+import time
+from typing import Optional, List
+import orjson
+from fastapi import FastAPI, HTTPException, Header, Request, Depends
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from shared.config import config
 from shared.redis_client import get_redis_client
-from .models import ReviewRequest, ReviewResponse, ReviewResult
+from .rate_limit import TOKEN_BUCKET_SCRIPT, check_rate_limit
+from .models import (
+    ReviewRequest, ReviewResponse, ReviewResult,
+    BulkStatusRequest, BulkStatusResponse, WorkerStatus, FleetStats,
+    ProfileSummary, Profile
+)
 
 app = FastAPI(title="AI Code Review Assistant")
 
@@ -20,20 +28,35 @@ async def read_index():
     return FileResponse('api/static/index.html')
 
 redis_client = get_redis_client()
+rate_limit_script = redis_client.register_script(TOKEN_BUCKET_SCRIPT)
 
-@app.post("/review", response_model=ReviewResponse)
+def rate_limit(scope: str, rate: float, burst: int):
+    async def dependency(request: Request):
+        check_rate_limit(rate_limit_script, redis_client, scope, request, rate, burst)
+    return Depends(dependency)
+
+limit_reviews = rate_limit("review", config.REVIEW_RATE_LIMIT, config.REVIEW_RATE_BURST)
+limit_status = rate_limit("status", config.STATUS_RATE_LIMIT, config.STATUS_RATE_BURST)
+
+@app.post("/review", response_model=ReviewResponse, dependencies=[limit_reviews])
 async def submit_review(request: ReviewRequest):
     submission_id = str(uuid.uuid4())
     job_data = {
         "id": submission_id,
         "diff": request.diff,
-        "language": request.language
+        "language": request.language,
+        # Lets /stats report how long the oldest job has been waiting
+        "enqueued_at": time.time()
     }
     
-    # Store initial status
+    # Store initial status. The version lets bulk pollers skip unchanged
+    # submissions; the ID isn't known to anyone until we return, so the
+    # INCR and HSET don't need to be atomic here.
+    version = redis_client.incr(config.RESULT_VERSION_KEY)
     redis_client.hset(f"result:{submission_id}", mapping={
         "status": "pending", 
-        "submission_id": submission_id
+        "submission_id": submission_id,
+        "version": version
     })
     
     # Push to queue
@@ -41,31 +64,184 @@ async def submit_review(request: ReviewRequest):
     
     return ReviewResponse(submission_id=submission_id, status="queued")
 
-@app.get("/status/{submission_id}", response_model=ReviewResult)
-async def get_status(submission_id: str):
+def _build_result(submission_id: str, result: dict) -> dict:
+    # Results written before the worker stored pre-serialized bodies keep
+    # their lists as separate JSON-encoded fields
+    if result.get("status") == "completed":
+        return {
+            "submission_id": result["submission_id"],
+            "status": result["status"],
+            "risk_score": int(result.get("risk_score", 0)),
+            "quality_score": int(result.get("quality_score", 0)),
+            "comments": json.loads(result.get("comments", "[]")),
+            "flags": json.loads(result.get("flags", "[]")),
+            "suggestions": json.loads(result.get("suggestions", "[]")),
+            "metrics": []
+        }
+            
+    return {
+        "submission_id": submission_id,
+        "status": result.get("status", "unknown"),
+        "risk_score": 0,
+        "quality_score": 0,
+        "comments": [],
+        "flags": [],
+        "suggestions": [],
+        "metrics": [],
+        "error": result.get("error")
+    }
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison against an If-None-Match list, as used for GET."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    if "*" in tags:
+        return True
+    # Proxies that compress responses weaken the tag to W/"..."
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any((tag[2:] if tag.startswith("W/") else tag) == opaque for tag in tags)
+
+@app.get("/status/{submission_id}", response_model=ReviewResult, dependencies=[limit_status])
+async def get_status(submission_id: str, if_none_match: Optional[str] = Header(None)):
     result = redis_client.hgetall(f"result:{submission_id}")
     
     if not result:
         raise HTTPException(status_code=404, detail="Submission not found")
+
+    # Completed results are stored fully serialized; serve the bytes as-is
+    body = result.get("body")
+    if body is not None:
+        etag = result.get("etag")
+        headers = {"ETag": etag} if etag else None
+        if etag and _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
         
-    # If processing is complete, parse lists from strings
-    if result.get("status") == "completed":
-        return ReviewResult(
-            submission_id=result["submission_id"],
-            status=result["status"],
-            risk_score=int(result.get("risk_score", 0)),
-            quality_score=int(result.get("quality_score", 0)),
-            comments=json.loads(result.get("comments", "[]")),
-            flags=json.loads(result.get("flags", "[]")),
-            suggestions=json.loads(result.get("suggestions", "[]"))
+    return _build_result(submission_id, result)
+
+@app.post("/status/bulk", response_model=BulkStatusResponse, dependencies=[limit_status])
+async def get_bulk_status(request: BulkStatusRequest):
+    # Preserve order but drop duplicates so each key is fetched once
+    submission_ids = list(dict.fromkeys(request.submission_ids))
+    if len(submission_ids) > config.BULK_STATUS_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {config.BULK_STATUS_MAX_IDS} submission IDs per request"
         )
-            
-    return ReviewResult(
-        submission_id=submission_id,
-        status=result.get("status", "unknown"),
-        risk_score=0,
-        quality_score=0,
-        comments=[],
-        flags=[],
-        suggestions=[]
+
+    # One round trip for the whole batch. MULTI/EXEC makes it a single
+    # snapshot: without it a stamp could land between two HGETALLs and the
+    # cursor would skip the older version.
+    pipe = redis_client.pipeline(transaction=True)
+    for submission_id in submission_ids:
+        pipe.hgetall(f"result:{submission_id}")
+    rows = pipe.execute()
+
+    since = request.since
+    cursor = since or 0
+    results = []
+    missing = []
+    for submission_id, result in zip(submission_ids, rows):
+        if not result:
+            missing.append(submission_id)
+            continue
+        version = int(result.get("version", 0))
+        cursor = max(cursor, version)
+        if since is None or version > since:
+            body = result.get("body")
+            if body is None:
+                body = orjson.dumps(_build_result(submission_id, result)).decode()
+            results.append(body)
+
+    # Splice the stored bodies in directly instead of parsing and re-encoding
+    content = '{"cursor":%d,"results":[%s],"missing":%s}' % (
+        cursor, ",".join(results), orjson.dumps(missing).decode()
+    )
+    return Response(content=content, media_type="application/json")
+
+@app.get("/stats", response_model=FleetStats, dependencies=[limit_status])
+async def get_stats():
+    now = time.time()
+    minute = int(now // 60)
+    window = range(minute - config.STATS_WINDOW_MINUTES + 1, minute + 1)
+
+    pipe = redis_client.pipeline(transaction=False)
+    # Forget workers whose heartbeat has lapsed, then read the live ones
+    pipe.zremrangebyscore(config.WORKERS_KEY, "-inf", now - config.HEARTBEAT_TTL)
+    pipe.zrange(config.WORKERS_KEY, 0, -1)
+    pipe.llen(config.SUBMISSION_QUEUE)
+    pipe.lindex(config.SUBMISSION_QUEUE, 0)
+    pipe.mget([f"{config.COMPLETED_COUNTER_PREFIX}{m}" for m in window])
+    pipe.zcard(config.RETRY_QUEUE)
+    pipe.llen(config.DEAD_LETTER_QUEUE)
+    (_, worker_ids, queue_depth, oldest_job, completed,
+     retry_depth, dead_letter_depth) = pipe.execute()
+
+    pipe = redis_client.pipeline(transaction=False)
+    for worker_id in worker_ids:
+        pipe.hgetall(f"{config.WORKER_KEY_PREFIX}{worker_id}")
+    heartbeats = pipe.execute() if worker_ids else []
+
+    workers = []
+    for state in heartbeats:
+        if not state:
+            continue
+        busy = float(state.get("busy_seconds", 0))
+        idle = float(state.get("idle_seconds", 0))
+        last_lag = state.get("last_queue_lag")
+        workers.append(WorkerStatus(
+            worker_id=state["worker_id"],
+            current_job=state.get("current_job") or None,
+            jobs_completed=int(state.get("jobs_completed", 0)),
+            busy_seconds=busy,
+            idle_seconds=idle,
+            utilization=busy / (busy + idle) if busy + idle else 0.0,
+            last_queue_lag=float(last_lag) if last_lag else None,
+            last_seen=float(state.get("last_seen", 0))
+        ))
+
+    oldest_job_age = None
+    if oldest_job:
+        # The queue can hold malformed payloads until a worker dead-letters them
+        try:
+            job = json.loads(oldest_job)
+            enqueued_at = job.get("enqueued_at") if isinstance(job, dict) else None
+            if enqueued_at is not None:
+                oldest_job_age = max(0.0, now - float(enqueued_at))
+        except (ValueError, TypeError, AttributeError):
+            pass
+
+    # The current minute is only partly over
+    window_seconds = (config.STATS_WINDOW_MINUTES - 1) * 60 + (now % 60)
+    drain_rate = sum(int(count or 0) for count in completed) / window_seconds
+
+    total_busy = sum(w.busy_seconds for w in workers)
+    total_time = total_busy + sum(w.idle_seconds for w in workers)
+    return FleetStats(
+        workers_alive=len(workers),
+        workers_busy=sum(1 for w in workers if w.current_job),
+        utilization=total_busy / total_time if total_time else 0.0,
+        queue_depth=queue_depth,
+        retry_queue_depth=retry_depth,
+        dead_letter_depth=dead_letter_depth,
+        oldest_job_age=oldest_job_age,
+        drain_rate=drain_rate,
+        estimated_drain_seconds=queue_depth / drain_rate if drain_rate else None,
+        workers=workers
     )
+
+def _load_profiles() -> list:
+    # Slowest first; the worker keeps this set trimmed to PROFILE_KEEP entries
+    return [orjson.loads(blob) for blob in redis_client.zrevrange(config.PROFILES_KEY, 0, -1)]
+
+@app.get("/profiles", response_model=List[ProfileSummary], dependencies=[limit_status])
+async def list_profiles():
+    return _load_profiles()
+
+@app.get("/profiles/{profile_id}", response_model=Profile, dependencies=[limit_status])
+async def get_profile(profile_id: str):
+    for profile in _load_profiles():
+        if profile["profile_id"] == profile_id:
+            return profile
+    raise HTTPException(status_code=404, detail="Profile not found")
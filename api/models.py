@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 class ReviewRequest(BaseModel):
     diff: str
@@ -9,6 +9,13 @@ class ReviewResponse(BaseModel):
     submission_id: str
     status: str
 
+class FunctionMetrics(BaseModel):
+    name: str
+    line: int
+    complexity: int
+    nesting: int
+    length: int
+
 class ReviewResult(BaseModel):
     submission_id: str
     status: str
@@ -17,3 +24,60 @@ class ReviewResult(BaseModel):
     comments: List[str]
     flags: List[str]
     suggestions: List[str] = []
+    metrics: List[FunctionMetrics] = []
+    # Set when status is "failed"
+    error: Optional[str] = None
+
+class BulkStatusRequest(BaseModel):
+    submission_ids: List[str]
+    # Only submissions whose version is greater than this are returned
+    since: Optional[int] = None
+
+class BulkStatusResponse(BaseModel):
+    cursor: int
+    results: List[ReviewResult]
+    missing: List[str] = []
+
+class WorkerStatus(BaseModel):
+    worker_id: str
+    current_job: Optional[str] = None
+    jobs_completed: int
+    busy_seconds: float
+    idle_seconds: float
+    utilization: float
+    last_queue_lag: Optional[float] = None
+    last_seen: float
+
+class FleetStats(BaseModel):
+    workers_alive: int
+    workers_busy: int
+    # Share of live workers' lifetime spent on jobs
+    utilization: float
+    queue_depth: int
+    retry_queue_depth: int = 0
+    dead_letter_depth: int = 0
+    # Seconds the job at the head of the queue has been waiting
+    oldest_job_age: Optional[float] = None
+    # Jobs completed per second, averaged over STATS_WINDOW_MINUTES
+    drain_rate: float
+    estimated_drain_seconds: Optional[float] = None
+    workers: List[WorkerStatus] = []
+
+class MemoryReport(BaseModel):
+    peak_bytes: int
+    top_allocations: List[str]
+
+class ProfileSummary(BaseModel):
+    profile_id: str
+    submission_id: str
+    recorded_at: float
+    duration: float
+    input_bytes: int
+    input_lines: int
+    # Seconds per stage, e.g. ast, flake8, bandit, redis
+    timings: Dict[str, float]
+
+class Profile(ProfileSummary):
+    # pstats output sorted by cumulative time
+    stats: str
+    memory: Optional[MemoryReport] = None
@@ -0,0 +1,68 @@
+import hashlib
+import math
+from fastapi import HTTPException, Request
+from redis.exceptions import RedisError
+from shared.config import config
+
+# Token bucket, refilled lazily from Redis server time so every API replica
+# shares one clock. Returns {allowed, retry_after_ms}.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = math.ceil((cost - tokens) / rate * 1000)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, retry_after}
+"""
+
+def client_id(request: Request) -> str:
+    """Identifies the caller by API key if it's a known one, otherwise by IP.
+
+    Unknown keys are ignored; otherwise a client could dodge its limit by
+    sending a fresh made-up key with every request.
+    """
+    api_key = request.headers.get("x-api-key")
+    if api_key and api_key in config.API_KEYS:
+        # Don't leak raw keys into Redis key names
+        return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+    host = request.client.host if request.client else "unknown"
+    return f"ip:{host}"
+
+def check_rate_limit(script, client, scope: str, request: Request, rate: float, burst: int):
+    """Spends one token from the caller's bucket, raising 429 when it's empty.
+
+    Costs a single EVALSHA round trip. If Redis is unreachable the request is
+    let through; the endpoint itself will surface the outage.
+    """
+    if rate <= 0:
+        return
+    key = f"ratelimit:{scope}:{client_id(request)}"
+    try:
+        result = script(keys=[key], args=[rate, burst, 1], client=client)
+    except RedisError:
+        return
+    if not int(result[0]):
+        retry_after = max(1, math.ceil(int(result[1]) / 1000))
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(retry_after)}
+        )
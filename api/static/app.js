@@ -69,6 +69,10 @@ document.addEventListener('DOMContentLoaded', () => {
                     clearInterval(interval);
                     showResults(data);
                     setLoading(false);
+                } else if (data.status === 'failed') {
+                    clearInterval(interval);
+                    alert(`Analysis failed: ${data.error || 'unknown error'}`);
+                    setLoading(false);
                 } else if (attempts >= maxAttempts) {
                     clearInterval(interval);
                     alert("Analysis timed out.");
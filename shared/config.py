@@ -5,5 +5,63 @@ class Config:
     REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
     REDIS_DB = int(os.getenv("REDIS_DB", 0))
     SUBMISSION_QUEUE = "submission_queue"
+    # Failed jobs wait in RETRY_QUEUE (a sorted set scored by due time) and
+    # land in DEAD_LETTER_QUEUE once they run out of retries
+    RETRY_QUEUE = "submission_retry"
+    DEAD_LETTER_QUEUE = "submission_dead_letter"
+    DEAD_LETTER_MAX = int(os.getenv("DEAD_LETTER_MAX", 1000))
+    JOB_MAX_RETRIES = int(os.getenv("JOB_MAX_RETRIES", 3))
+    # Seconds before the first retry, doubling per attempt up to the max
+    JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", 2))
+    JOB_RETRY_MAX_BACKOFF = float(os.getenv("JOB_RETRY_MAX_BACKOFF", 60))
+    # Each worker claims jobs into its own list under this prefix until the
+    # outcome is written; lists of dead workers are put back on the queue
+    PROCESSING_KEY_PREFIX = "processing:"
+    # How long BLMOVE waits before the worker checks for due retries
+    WORKER_POLL_TIMEOUT = int(os.getenv("WORKER_POLL_TIMEOUT", 1))
+    # Monotonic counter stamped onto result hashes on every state change
+    RESULT_VERSION_KEY = "result_version"
+    # Inputs with more lines than this are split at top-level definitions
+    # and linted in parallel
+    ANALYZER_CHUNK_LINES = int(os.getenv("ANALYZER_CHUNK_LINES", 5000))
+    ANALYZER_CHUNK_WORKERS = int(os.getenv("ANALYZER_CHUNK_WORKERS", os.cpu_count() or 1))
+    BULK_STATUS_MAX_IDS = int(os.getenv("BULK_STATUS_MAX_IDS", 500))
+    # Worker heartbeats and fleet telemetry
+    WORKERS_KEY = "workers"
+    WORKER_KEY_PREFIX = "worker:"
+    COMPLETED_COUNTER_PREFIX = "stats:completed:"
+    HEARTBEAT_INTERVAL = float(os.getenv("HEARTBEAT_INTERVAL", 5))
+    # Workers that haven't reported for this long are considered dead
+    HEARTBEAT_TTL = int(os.getenv("HEARTBEAT_TTL", 30))
+    # Drain rate is averaged over this many minutes of completions
+    STATS_WINDOW_MINUTES = int(os.getenv("STATS_WINDOW_MINUTES", 5))
+    # Sampling profiler: fraction of jobs to profile (0 disables it), whether
+    # to trace memory too, and how many of the slowest profiles to keep
+    PROFILES_KEY = "profiles"
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+    PROFILE_MEMORY = os.getenv("PROFILE_MEMORY", "0").lower() in ("1", "true", "yes")
+    PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", 20))
+    PROFILE_TOP_ENTRIES = int(os.getenv("PROFILE_TOP_ENTRIES", 30))
+    # Autoscaling supervisor
+    SUPERVISOR_MIN_WORKERS = int(os.getenv("SUPERVISOR_MIN_WORKERS", 1))
+    SUPERVISOR_MAX_WORKERS = int(os.getenv("SUPERVISOR_MAX_WORKERS", os.cpu_count() or 1))
+    SCALE_INTERVAL = float(os.getenv("SCALE_INTERVAL", 5))
+    # Size the fleet to clear the current backlog within this many seconds
+    SCALE_TARGET_DRAIN_SECONDS = float(os.getenv("SCALE_TARGET_DRAIN_SECONDS", 30))
+    # Spare capacity on top of the steady-state arrival rate
+    SCALE_HEADROOM = float(os.getenv("SCALE_HEADROOM", 1.2))
+    # Demand must stay low this long before workers are drained
+    SCALE_DOWN_COOLDOWN = float(os.getenv("SCALE_DOWN_COOLDOWN", 60))
+    # Assumed job time until workers have reported real numbers
+    DEFAULT_JOB_SECONDS = float(os.getenv("DEFAULT_JOB_SECONDS", 2))
+    # Per-client token buckets: RATE is tokens per second, BURST the bucket
+    # size. A rate of 0 disables the limit.
+    REVIEW_RATE_LIMIT = float(os.getenv("REVIEW_RATE_LIMIT", 1))
+    REVIEW_RATE_BURST = int(os.getenv("REVIEW_RATE_BURST", 10))
+    STATUS_RATE_LIMIT = float(os.getenv("STATUS_RATE_LIMIT", 20))
+    STATUS_RATE_BURST = int(os.getenv("STATUS_RATE_BURST", 60))
+    # Comma-separated keys that get their own bucket via X-API-Key; any
+    # other key is ignored and the caller is limited by IP
+    API_KEYS = frozenset(k.strip() for k in os.getenv("API_KEYS", "").split(",") if k.strip())
 
 config = Config()
@@ -8,3 +8,19 @@ def get_redis_client():
         db=config.REDIS_DB,
         decode_responses=True
     )
+
+# Bumps the global result version and writes it together with the given
+# fields in one atomic step, so readers never observe version N+1 before N.
+STAMP_RESULT_SCRIPT = """
+local version = redis.call('INCR', KEYS[2])
+redis.call('HSET', KEYS[1], 'version', version, unpack(ARGV))
+return version
+"""
+
+def stamp_result(client, submission_id, mapping):
+    args = [item for pair in mapping.items() for item in pair]
+    return client.eval(
+        STAMP_RESULT_SCRIPT, 2,
+        f"result:{submission_id}", config.RESULT_VERSION_KEY,
+        *args
+    )
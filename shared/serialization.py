@@ -0,0 +1,12 @@
+import hashlib
+import orjson
+
+def encode_result(result: dict) -> tuple:
+    """Serializes a finished review once, returning (body, etag).
+
+    The body is stored as-is and served straight back by the API, so it must
+    already match the ReviewResult schema.
+    """
+    body = orjson.dumps(result)
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    return body, etag
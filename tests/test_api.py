@@ -10,6 +10,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from api.main import app
+from shared.config import config
 
 # Mock Redis before client creation might be needed, 
 # but getting client happens at import time in main.py.
@@ -18,6 +19,8 @@ from api.main import app
 @pytest.fixture
 def mock_redis():
     with patch("api.main.redis_client") as mock:
+        # Rate limiter script: allowed, no retry delay
+        mock.evalsha.return_value = [1, 0]
         yield mock
 
 client = TestClient(app)
@@ -80,3 +83,191 @@ def test_get_status_not_found(mock_redis):
     
     response = client.get("/status/non-existent")
     assert response.status_code == 404
+
+def test_bulk_status_filters_unchanged(mock_redis):
+    pipe = mock_redis.pipeline.return_value
+    pipe.execute.return_value = [
+        {"submission_id": "a", "status": "pending", "version": "3"},
+        {"submission_id": "b", "status": "completed", "version": "7",
+         "risk_score": "10", "quality_score": "90",
+         "comments": "[]", "flags": '["Flag 1"]'},
+        {}
+    ]
+
+    response = client.post("/status/bulk", json={
+        "submission_ids": ["a", "b", "c"],
+        "since": 5
+    })
+    assert response.status_code == 200
+    data = response.json()
+
+    # One HGETALL per ID, all in one MULTI/EXEC so they see the same state
+    mock_redis.pipeline.assert_called_once_with(transaction=True)
+    assert pipe.hgetall.call_count == 3
+    pipe.execute.assert_called_once()
+
+    assert data["cursor"] == 7
+    assert [r["submission_id"] for r in data["results"]] == ["b"]
+    assert data["results"][0]["flags"] == ["Flag 1"]
+    assert data["missing"] == ["c"]
+
+def test_bulk_status_without_cursor_returns_all(mock_redis):
+    mock_redis.pipeline.return_value.execute.return_value = [
+        {"submission_id": "a", "status": "pending", "version": "3"}
+    ]
+
+    response = client.post("/status/bulk", json={"submission_ids": ["a", "a"]})
+    data = response.json()
+
+    assert data["cursor"] == 3
+    assert len(data["results"]) == 1
+    assert data["results"][0]["status"] == "pending"
+
+def test_bulk_status_too_many_ids(mock_redis):
+    ids = [str(i) for i in range(501)]
+    response = client.post("/status/bulk", json={"submission_ids": ids})
+    assert response.status_code == 400
+
+def test_get_status_serves_stored_body(mock_redis):
+    body = '{"submission_id":"test-blob","status":"completed","risk_score":5,"quality_score":95,"comments":[],"flags":[],"suggestions":[]}'
+    mock_redis.hgetall.return_value = {
+        "submission_id": "test-blob",
+        "status": "completed",
+        "body": body,
+        "etag": '"abc"'
+    }
+
+    response = client.get("/status/test-blob")
+    assert response.status_code == 200
+    assert response.text == body
+    assert response.headers["etag"] == '"abc"'
+
+    # Conditional request with a matching ETag skips the body
+    response = client.get("/status/test-blob", headers={"If-None-Match": '"abc"'})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    # Lists, weak tags from compressing proxies and * all match
+    for header in ['"other", "abc"', 'W/"abc"', '*']:
+        response = client.get("/status/test-blob", headers={"If-None-Match": header})
+        assert response.status_code == 304, header
+
+    response = client.get("/status/test-blob", headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+
+def test_bulk_status_splices_stored_bodies(mock_redis):
+    body = '{"submission_id":"a","status":"completed","risk_score":5,"quality_score":95,"comments":[],"flags":[],"suggestions":[]}'
+    mock_redis.pipeline.return_value.execute.return_value = [
+        {"submission_id": "a", "status": "completed", "version": "2", "body": body}
+    ]
+
+    response = client.post("/status/bulk", json={"submission_ids": ["a"]})
+    data = response.json()
+
+    assert data["cursor"] == 2
+    assert data["results"][0]["risk_score"] == 5
+
+def test_rate_limit_rejects_when_bucket_empty(mock_redis):
+    mock_redis.evalsha.return_value = [0, 2500]
+
+    response = client.post("/review", json={"diff": "x = 1"})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "3"
+    # Nothing was queued
+    mock_redis.rpush.assert_not_called()
+
+def test_rate_limit_buckets_by_api_key_and_scope(mock_redis):
+    mock_redis.hgetall.return_value = {"submission_id": "x", "status": "pending"}
+
+    with patch.object(config, "API_KEYS", frozenset({"secret-key"})):
+        client.get("/status/x", headers={"X-API-Key": "secret-key"})
+
+    # One EVALSHA per request, keyed by scope and a hash of the API key
+    mock_redis.evalsha.assert_called_once()
+    args = mock_redis.evalsha.call_args[0]
+    key = args[2]
+    assert key.startswith("ratelimit:status:key:")
+    assert "secret-key" not in key
+
+def test_rate_limit_unknown_api_key_falls_back_to_ip(mock_redis):
+    mock_redis.hgetall.return_value = {"submission_id": "x", "status": "pending"}
+
+    with patch.object(config, "API_KEYS", frozenset({"secret-key"})):
+        client.get("/status/x", headers={"X-API-Key": "made-up-key"})
+
+    # A made-up key must not buy the caller a fresh bucket
+    key = mock_redis.evalsha.call_args[0][2]
+    assert key == "ratelimit:status:ip:testclient"
+
+def test_stats_aggregates_fleet(mock_redis):
+    now = 1_000_000.0
+    pipe = mock_redis.pipeline.return_value
+    pipe.execute.side_effect = [
+        # prune, live workers, queue depth, head of queue, completion
+        # counters, retry queue, dead-letter queue
+        [0, ["w1", "w2"], 4, json.dumps({"id": "old", "enqueued_at": now - 30}),
+         ["60", None, None, "30", "6"], 2, 1],
+        [
+            {"worker_id": "w1", "current_job": "job-9", "jobs_completed": "10",
+             "busy_seconds": "30", "idle_seconds": "10", "last_seen": str(now)},
+            {"worker_id": "w2", "current_job": "", "jobs_completed": "5",
+             "busy_seconds": "10", "idle_seconds": "30", "last_seen": str(now)}
+        ]
+    ]
+
+    with patch("api.main.time.time", return_value=now):
+        response = client.get("/stats")
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["workers_alive"] == 2
+    assert data["workers_busy"] == 1
+    assert data["utilization"] == 0.5
+    assert data["queue_depth"] == 4
+    assert data["retry_queue_depth"] == 2
+    assert data["dead_letter_depth"] == 1
+    assert data["oldest_job_age"] == 30
+    # 96 jobs over four full minutes plus 40s of the current one
+    assert data["drain_rate"] == pytest.approx(96 / 280)
+    assert data["workers"][0]["utilization"] == 0.75
+
+@pytest.mark.parametrize("head", ["{not json", "[1, 2]", '{"enqueued_at": "soon"}'])
+def test_stats_tolerates_malformed_queue_head(mock_redis, head):
+    pipe = mock_redis.pipeline.return_value
+    pipe.execute.side_effect = [[0, [], 1, head, [None] * 5, 0, 0]]
+
+    response = client.get("/stats")
+
+    assert response.status_code == 200
+    assert response.json()["oldest_job_age"] is None
+
+def test_profiles_list_and_detail(mock_redis):
+    profile = {
+        "profile_id": "p1", "submission_id": "s1", "recorded_at": 1.0,
+        "duration": 2.5, "input_bytes": 10, "input_lines": 1,
+        "timings": {"flake8": 2.0}, "stats": "42 function calls", "memory": None
+    }
+    mock_redis.zrevrange.return_value = [json.dumps(profile)]
+
+    response = client.get("/profiles")
+    assert response.status_code == 200
+    summaries = response.json()
+    assert summaries[0]["profile_id"] == "p1"
+    assert "stats" not in summaries[0]
+
+    response = client.get("/profiles/p1")
+    assert response.json()["stats"] == "42 function calls"
+
+    assert client.get("/profiles/missing").status_code == 404
+
+def test_get_status_failed(mock_redis):
+    mock_redis.hgetall.return_value = {
+        "submission_id": "test-bad",
+        "status": "failed",
+        "error": "ValueError: boom"
+    }
+
+    response = client.get("/status/test-bad")
+    data = response.json()
+    assert data["status"] == "failed"
+    assert data["error"] == "ValueError: boom"
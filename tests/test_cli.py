@@ -0,0 +1,121 @@
+import pytest
+from unittest.mock import patch
+import subprocess
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worker import cli
+
+FAKE_RESULT = {
+    "risk_score": 0,
+    "quality_score": 100,
+    "comments": [],
+    "flags": [],
+    "suggestions": []
+}
+
+def test_iter_python_files_skips_hidden_and_build_dirs(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "a.py").write_text("x = 1\n")
+    (tmp_path / "pkg" / "notes.txt").write_text("hi")
+    (tmp_path / ".venv").mkdir()
+    (tmp_path / ".venv" / "b.py").write_text("y = 2\n")
+    (tmp_path / "__pycache__").mkdir()
+    (tmp_path / "__pycache__" / "c.py").write_text("z = 3\n")
+
+    files = list(cli.iter_python_files(str(tmp_path)))
+
+    assert files == [str(tmp_path / "pkg" / "a.py")]
+
+@patch("worker.analyzer.Analyzer.analyze", return_value=FAKE_RESULT)
+def test_scan_file_uses_content_cache(mock_analyze, tmp_path):
+    source = tmp_path / "mod.py"
+    source.write_text("x = 1\n")
+    cache_dir = str(tmp_path / "cache")
+
+    first = cli.scan_file((str(source), None, None), cache_dir=cache_dir)
+    second = cli.scan_file((str(source), None, None), cache_dir=cache_dir)
+
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert second["quality_score"] == 100
+    mock_analyze.assert_called_once()
+
+    # Changing the contents misses the cache
+    source.write_text("x = 2\n")
+    third = cli.scan_file((str(source), None, None), cache_dir=cache_dir)
+    assert third["cached"] is False
+    assert mock_analyze.call_count == 2
+
+def test_scan_file_reports_unreadable_file(tmp_path):
+    record = cli.scan_file((str(tmp_path / "missing.py"), None, None))
+    assert "error" in record
+
+@patch("worker.analyzer.Analyzer.analyze", side_effect=RecursionError("too deep"))
+def test_scan_file_reports_analyzer_crash(mock_analyze, tmp_path):
+    source = tmp_path / "mod.py"
+    source.write_text("x = 1\n")
+
+    record = cli.scan_file((str(source), None, None))
+
+    assert record["path"] == str(source)
+    assert "RecursionError" in record["error"]
+
+def test_fail_on_error_sets_exit_status(tmp_path, capsys):
+    missing = str(tmp_path / "gone.py")
+    with patch("worker.cli.iter_python_files", return_value=[missing]):
+        assert cli.main([str(tmp_path), "-j", "1"]) == 0
+        assert cli.main([str(tmp_path), "-j", "1", "--fail-on-error"]) == 1
+
+def _git(repo, *args):
+    subprocess.run(
+        ["git", "-C", str(repo), "-c", "user.name=t", "-c", "user.email=t@t", *args],
+        capture_output=True, check=True
+    )
+
+@pytest.fixture
+def repo(tmp_path):
+    """main changes c.py after feature branches off; feature changes pkg/a.py."""
+    _git(tmp_path, "init", "-q", "-b", "main")
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "a.py").write_text("x = 1\n")
+    (tmp_path / "c.py").write_text("y = 1\n")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-q", "-m", "base")
+    _git(tmp_path, "checkout", "-q", "-b", "feature")
+    (tmp_path / "pkg" / "a.py").write_text("x = 2\n")
+    _git(tmp_path, "commit", "-q", "-am", "feature")
+    _git(tmp_path, "checkout", "-q", "main")
+    (tmp_path / "c.py").write_text("y = 2\n")
+    _git(tmp_path, "commit", "-q", "-am", "main")
+    return tmp_path
+
+def test_git_changed_files_three_dot_uses_merge_base(repo):
+    toplevel = os.path.realpath(repo)
+    two_dot = cli.git_changed_files("main..feature", str(repo))
+    three_dot = cli.git_changed_files("main...feature", str(repo))
+
+    # Two dots also see main's own change, three dots only the branch's
+    assert sorted(path for path, _, _ in two_dot) == [
+        os.path.join(toplevel, "c.py"), os.path.join(toplevel, "pkg", "a.py")
+    ]
+    assert three_dot == [(os.path.join(toplevel, "pkg", "a.py"), "feature", toplevel)]
+
+def test_read_source_resolves_paths_from_repo_root(repo, monkeypatch):
+    # pkg/ doesn't exist in the working tree, as with the base checked out
+    (repo / "pkg" / "a.py").unlink()
+    (repo / "pkg").rmdir()
+    monkeypatch.chdir(repo.parent)
+
+    [task] = cli.git_changed_files("main...feature", str(repo))
+    assert cli._read_source(*task) == b"x = 2\n"
+
+def test_bad_git_range_is_a_usage_error(repo, capsys):
+    with pytest.raises(SystemExit) as excinfo:
+        cli.main(["--git-diff", "nope...HEAD", "--repo", str(repo)])
+
+    assert excinfo.value.code == 2
+    assert "nope" in capsys.readouterr().err
@@ -0,0 +1,61 @@
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worker.heartbeat import Heartbeat
+
+@pytest.fixture
+def heartbeat():
+    return Heartbeat(MagicMock(), worker_id="host:1", interval=60)
+
+def test_snapshot_tracks_busy_and_idle_time(heartbeat):
+    with patch("time.time", return_value=heartbeat.started_at + 10):
+        heartbeat.job_started("job-1", enqueued_at=heartbeat.started_at + 7)
+    with patch("time.time", return_value=heartbeat.started_at + 14):
+        state = heartbeat.snapshot()
+
+    assert state["current_job"] == "job-1"
+    assert state["busy_seconds"] == 4
+    assert state["idle_seconds"] == 10
+    assert state["last_queue_lag"] == 3
+
+    with patch("time.time", return_value=heartbeat.started_at + 15):
+        heartbeat.job_finished()
+        state = heartbeat.snapshot()
+
+    assert state["current_job"] == ""
+    assert state["jobs_completed"] == 1
+    assert state["busy_seconds"] == 5
+
+def test_job_finished_bumps_minute_counter(heartbeat):
+    with patch("time.time", return_value=120.5):
+        heartbeat.job_finished()
+
+    pipe = heartbeat.client.pipeline.return_value
+    pipe.incr.assert_called_once_with("stats:completed:2")
+    pipe.execute.assert_called_once()
+
+def test_job_failed_keeps_busy_time_but_not_completion(heartbeat):
+    with patch("time.time", return_value=heartbeat.started_at + 10):
+        heartbeat.job_started("job-1")
+    with patch("time.time", return_value=heartbeat.started_at + 12):
+        heartbeat.job_failed()
+        state = heartbeat.snapshot()
+
+    assert state["current_job"] == ""
+    assert state["jobs_completed"] == 0
+    assert state["busy_seconds"] == 2
+    heartbeat.client.pipeline.assert_not_called()
+
+def test_publish_registers_worker(heartbeat):
+    heartbeat.publish()
+
+    pipe = heartbeat.client.pipeline.return_value
+    pipe.hset.assert_called_once()
+    assert pipe.hset.call_args[0][0] == "worker:host:1"
+    pipe.zadd.assert_called_once()
+    pipe.execute.assert_called_once()
@@ -0,0 +1,136 @@
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+import json
+
+# The worker runs as a script, so its modules import each other by bare name
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "worker"))
+
+import processor
+
+@pytest.fixture
+def mock_redis():
+    with patch("processor.redis_client") as mock, \
+         patch("processor.heartbeat") as mock_heartbeat, \
+         patch("processor.stamp_result") as mock_stamp:
+        mock.stamp = mock_stamp
+        mock.heartbeat = mock_heartbeat
+        yield mock
+
+def dead_letter_call(mock_redis):
+    """Returns (keys, args) of the single DEAD_LETTER_SCRIPT call."""
+    [(script, numkeys, *rest)] = [
+        c[0] for c in mock_redis.eval.call_args_list if c[0][0] == processor.DEAD_LETTER_SCRIPT
+    ]
+    return rest[:numkeys], rest[numkeys:]
+
+def test_failing_job_is_scheduled_for_retry(mock_redis):
+    job = {"id": "job-1", "diff": "x = 1"}
+    with patch.object(processor.analyzer, "analyze", side_effect=RuntimeError("boom")), \
+         patch("time.time", return_value=1000.0):
+        processor._handle_job(json.dumps(job))
+
+    (key, mapping), _ = mock_redis.zadd.call_args
+    retried, due = next(iter(mapping.items()))
+    assert key == "submission_retry"
+    assert json.loads(retried)["attempts"] == 1
+    assert due == 1000.0 + processor.config.JOB_RETRY_BACKOFF
+    mock_redis.stamp.assert_not_called()
+
+    # A failed attempt isn't a completion
+    mock_redis.heartbeat.job_failed.assert_called_once()
+    mock_redis.heartbeat.job_finished.assert_not_called()
+
+def test_job_out_of_retries_is_dead_lettered(mock_redis):
+    job = {"id": "job-1", "diff": "x = 1", "attempts": processor.config.JOB_MAX_RETRIES}
+    data = json.dumps(job)
+    with patch.object(processor.analyzer, "analyze", side_effect=RuntimeError("boom")):
+        processor._handle_job(data)
+
+    mock_redis.zadd.assert_not_called()
+    # Entry, claim release and failed status go out in one atomic script,
+    # so a crash can't requeue a job that was already dead-lettered
+    keys, args = dead_letter_call(mock_redis)
+    assert keys == ["submission_dead_letter", processor.processing_key,
+                    "result_version", "result:job-1"]
+    entry = json.loads(args[0])
+    assert entry["job"]["id"] == "job-1"
+    assert entry["error"] == "RuntimeError: boom"
+    assert args[2] == data
+    # Pollers see the failure instead of waiting forever
+    assert args[3:] == ["job-1", "RuntimeError: boom"]
+    mock_redis.stamp.assert_not_called()
+
+def test_malformed_job_skips_retries(mock_redis):
+    processor._handle_job("{not json")
+
+    mock_redis.zadd.assert_not_called()
+    keys, args = dead_letter_call(mock_redis)
+    # No submission id, so no result to stamp
+    assert len(keys) == 3
+    assert json.loads(args[0])["job"] == "{not json"
+
+def test_job_without_diff_is_marked_failed(mock_redis):
+    processor._handle_job(json.dumps({"id": "job-1"}))
+
+    mock_redis.zadd.assert_not_called()
+    keys, args = dead_letter_call(mock_redis)
+    assert json.loads(args[0])["job"] == {"id": "job-1"}
+    assert keys[3] == "result:job-1"
+    assert args[3] == "job-1"
+
+def test_poll_claims_job_until_outcome_is_written(mock_redis):
+    data = json.dumps({"id": "job-1", "diff": "x = 1"})
+    mock_redis.blmove.return_value = data
+    with patch.object(processor.analyzer, "analyze", return_value={
+        "risk_score": 0, "quality_score": 100, "comments": [], "flags": []
+    }):
+        processor._poll_once()
+
+    queue, claimed, *_ = mock_redis.blmove.call_args[0]
+    assert queue == "submission_queue"
+    assert claimed == processor.processing_key
+    mock_redis.stamp.assert_called_once()
+    mock_redis.lrem.assert_called_once_with(processor.processing_key, 1, data)
+    mock_redis.heartbeat.job_finished.assert_called_once()
+
+def test_claim_is_kept_when_no_outcome_is_written(mock_redis):
+    mock_redis.blmove.return_value = json.dumps({"id": "job-1", "diff": "x = 1"})
+    mock_redis.zadd.side_effect = ConnectionError("down")
+    with patch.object(processor.analyzer, "analyze", side_effect=RuntimeError("boom")), \
+         pytest.raises(ConnectionError):
+        processor._poll_once()
+
+    # Left in the processing list for _requeue_orphans to put back
+    mock_redis.lrem.assert_not_called()
+
+def test_requeue_orphans_skips_live_workers(mock_redis):
+    mock_redis.scan_iter.return_value = [
+        "processing:dead:1", "processing:live:2", processor.processing_key
+    ]
+    mock_redis.zscore.side_effect = lambda key, worker_id: 1000.0 if worker_id == "live:2" else None
+    mock_redis.eval.return_value = 1
+    with patch("time.time", return_value=1010.0):
+        processor._requeue_orphans()
+
+    requeued = [c[0][2] for c in mock_redis.eval.call_args_list]
+    assert requeued == ["processing:dead:1", processor.processing_key]
+    assert all(c[0][3] == "submission_queue" for c in mock_redis.eval.call_args_list)
+
+def test_orphan_out_of_attempts_is_dead_lettered(mock_redis):
+    job = {"id": "job-1", "diff": "x = 1", "attempts": processor.config.JOB_MAX_RETRIES + 1}
+    with patch.object(processor.analyzer, "analyze") as mock_analyze:
+        processor._handle_job(json.dumps(job))
+
+    mock_analyze.assert_not_called()
+    keys, args = dead_letter_call(mock_redis)
+    assert keys[3] == "result:job-1"
+    assert args[4] == "RuntimeError: Worker died while processing the job"
+
+def test_loop_survives_redis_errors(mock_redis):
+    mock_redis.eval.side_effect = [ConnectionError("down"), KeyboardInterrupt]
+    with patch("time.sleep") as mock_sleep, pytest.raises(KeyboardInterrupt):
+        processor._drain_queue()
+    mock_sleep.assert_called_once()
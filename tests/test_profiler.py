@@ -0,0 +1,44 @@
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+import orjson
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worker.profiler import JobProfiler
+
+def test_sampling_off_skips_profiling():
+    client = MagicMock()
+    profiler = JobProfiler(client, sample_rate=0)
+
+    with patch("cProfile.Profile") as mock_profile:
+        with profiler.job("job-1", "x = 1") as timings:
+            timings["ast"] = 0.1
+
+    mock_profile.assert_not_called()
+    client.pipeline.assert_not_called()
+
+def test_sampled_job_is_stored_and_trimmed():
+    client = MagicMock()
+    profiler = JobProfiler(client, sample_rate=1, memory=True, keep=5)
+
+    with profiler.job("job-1", "x = 1\ny = 2") as timings:
+        timings["flake8"] = 0.25
+        sum(range(1000))
+
+    pipe = client.pipeline.return_value
+    (key, mapping), _ = pipe.zadd.call_args
+    blob, duration = next(iter(mapping.items()))
+    record = orjson.loads(blob)
+
+    assert key == "profiles"
+    assert record["submission_id"] == "job-1"
+    assert record["input_lines"] == 2
+    assert record["timings"] == {"flake8": 0.25}
+    assert record["duration"] == duration
+    assert "function calls" in record["stats"]
+    assert record["memory"]["peak_bytes"] >= 0
+    # Everything but the 5 slowest is dropped
+    pipe.zremrangebyrank.assert_called_once_with("profiles", 0, -6)
@@ -0,0 +1,72 @@
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worker import supervisor
+from worker.supervisor import Supervisor, desired_workers
+
+@pytest.fixture(autouse=True)
+def scaling_config():
+    with patch.multiple(
+        supervisor.config,
+        SUPERVISOR_MIN_WORKERS=1,
+        SUPERVISOR_MAX_WORKERS=8,
+        SCALE_HEADROOM=1.0,
+        SCALE_TARGET_DRAIN_SECONDS=30,
+        SCALE_DOWN_COOLDOWN=60
+    ):
+        yield
+
+def test_desired_workers_littles_law_and_backlog():
+    # 2 jobs/s x 1.5s per job = 3 busy workers, plus 60 queued jobs
+    # x 1.5s / 30s = 3 more to clear the backlog in time
+    assert desired_workers(queue_depth=60, arrival_rate=2.0, mean_job_seconds=1.5) == 6
+
+def test_desired_workers_is_clamped():
+    assert desired_workers(queue_depth=0, arrival_rate=0.0, mean_job_seconds=2.0) == 1
+    assert desired_workers(queue_depth=10_000, arrival_rate=50.0, mean_job_seconds=2.0) == 8
+
+def test_observe_estimates_arrivals_and_job_time():
+    client = MagicMock()
+    pipe = client.pipeline.return_value
+    pipe.execute.side_effect = [
+        # depth, retries, completion counters (last and current minute), live workers
+        [10, 0, ["5", "0"], ["w1"]],
+        [["20", "10"]],
+        [16, 0, ["5", "4"], ["w1"]],
+        [["28", "14"]],
+    ]
+    sup = Supervisor(client)
+
+    with patch("time.time", return_value=6000.0):
+        first = sup.observe()
+    with patch("time.time", return_value=6002.0):
+        second = sup.observe()
+
+    assert first["arrival_rate"] == 0.0
+    assert first["mean_job_seconds"] == 2.0
+    # 4 completed + queue grew by 6 over 2 seconds
+    assert second["arrival_rate"] == 5.0
+    assert second["queue_depth"] == 16
+
+def test_reconcile_scales_up_now_and_down_after_cooldown():
+    sup = Supervisor(MagicMock())
+    with patch.object(sup, "_spawn", side_effect=lambda: sup.workers.append(MagicMock(poll=lambda: None))) as spawn, \
+         patch.object(sup, "_drain") as drain:
+        busy = {"queue_depth": 90, "arrival_rate": 0.0, "mean_job_seconds": 1.0}
+        sup.reconcile(busy)
+        assert spawn.call_count == 3
+
+        quiet = {"queue_depth": 0, "arrival_rate": 0.0, "mean_job_seconds": 1.0}
+        with patch("time.time", return_value=1000.0):
+            sup.reconcile(quiet)
+        drain.assert_not_called()
+
+        with patch("time.time", return_value=1061.0):
+            sup.reconcile(quiet)
+        assert drain.call_count == 2
+        assert len(sup.workers) == 1
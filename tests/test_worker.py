@@ -8,7 +8,7 @@ import json
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from worker.analyzer import Analyzer
+from worker.analyzer import Analyzer, _split_module, _chunk_line
 
 class TestAnalyzer:
     @pytest.fixture
@@ -92,3 +92,140 @@ class TestAnalyzer:
              # If bandit (mocked) returns 0, heuristics kick in
              assert risk == 50
              assert "Security: Manual detection of eval/exec" in flags[0]
+
+    def test_ast_check_function_metrics(self, analyzer):
+        code = (
+            "class Service:\n"
+            "    def run(self, items):\n"
+            "        for item in items:\n"
+            "            if item and item.ok:\n"
+            "                pass\n"
+            "            elif item:\n"
+            "                pass\n"
+            "        return [i for i in items if i]\n"
+        )
+        risk, flags, syntax_error, suggestions, metrics = analyzer._ast_check(code)
+
+        assert syntax_error is None
+        assert metrics == [{
+            "name": "Service.run",
+            "line": 2,
+            # 1 + for + if + `and` + elif + comprehension with one filter
+            "complexity": 7,
+            # for -> if; the elif stays at the same depth
+            "nesting": 2,
+            "length": 7
+        }]
+
+    def test_ast_check_infinite_loop_single_pass(self, analyzer):
+        code = (
+            "while True:\n"
+            "    while True:\n"
+            "        break\n"
+            "while True:\n"
+            "    pass\n"
+        )
+        risk, flags, _, _, _ = analyzer._ast_check(code)
+
+        # Only the last loop has no break anywhere inside it
+        assert risk == 30
+        assert flags == ["Logic: Potential infinite loop (while True without break)"]
+
+    def test_ast_check_long_expression_chain(self, analyzer):
+        # A left-nested BinOp chain thousands of levels deep, as generated
+        # code produces; the walk must not hit the recursion limit
+        code = "def total():\n    return " + " + ".join(["1"] * 2000) + "\n"
+        risk, flags, syntax_error, _, metrics = analyzer._ast_check(code)
+
+        assert syntax_error is None
+        assert risk == 0
+        assert metrics[0]["name"] == "total"
+
+    def test_assess_risk_uses_function_metrics(self, analyzer):
+        metrics = [
+            {"name": "tangled", "line": 1, "complexity": 15, "nesting": 6, "length": 20},
+            {"name": "tidy", "line": 30, "complexity": 2, "nesting": 1, "length": 5}
+        ]
+        with patch("worker.analyzer.Analyzer._run_bandit", return_value=(0, [])):
+            # Long input no longer matters once per-function metrics exist
+            risk, flags = analyzer._assess_risk("x = 1\n" * 200, "dummy_path", metrics)
+
+        assert risk == 10
+        assert len(flags) == 2
+        assert all("`tangled`" in f for f in flags)
+
+CHUNKED_MODULE = (
+    "import os\n"          # 1
+    "import sys\n"         # 2
+    "\n"                   # 3
+    "\n"                   # 4
+    "def first():\n"       # 5
+    "    return os.sep\n"  # 6
+    "\n"                   # 7
+    "\n"                   # 8
+    "def second():\n"      # 9
+    "    return first()\n" # 10
+)
+
+class TestChunking:
+    def test_split_module_repeats_header_and_stubs_other_chunks(self):
+        chunks = _split_module(CHUNKED_MODULE, 2)
+
+        assert len(chunks) == 2
+        source, header_lines, stub_lines, body_start = chunks[1]
+        assert header_lines == 2
+        # `first` lives in the other chunk, so it gets a stub
+        assert stub_lines == 1
+        assert body_start == 7
+        assert source.splitlines()[:3] == ["import os", "import sys", "first = None"]
+        assert "def second():" in source
+        assert "def first():" not in source
+
+    def test_analyze_chunks_merges_and_remaps_lines(self):
+        analyzer = Analyzer(chunk_lines=5, chunk_workers=2)
+        chunks = analyzer._split_chunks(CHUNKED_MODULE)
+        assert len(chunks) == 2
+
+        def fake_chunk(source):
+            issues = []
+            # The header import is unused in the chunk that doesn't use os,
+            # and `sys` is unused everywhere
+            if "os.sep" not in source:
+                issues.append((1, (1, "F401 'os' imported but unused")))
+            issues.append((2, (1, "F401 'sys' imported but unused")))
+            if "def second" in source:
+                # Line 7 of the second chunk is line 10 of the original file
+                issues.append((7, (5, "E999 made up")))
+            return issues, []
+
+        with patch.object(analyzer, "_analyze_chunk", side_effect=fake_chunk):
+            lint_errors, bandit = analyzer._analyze_chunks(chunks)
+
+        assert lint_errors == ["F401 'sys' imported but unused", "E999 made up"]
+        assert bandit == (0, [])
+        assert _chunk_line(chunks[1], 7) == 10
+        # Stub lines have no original line
+        assert _chunk_line(chunks[1], 3) is None
+
+    def test_analyze_chunks_reports_failures_per_linter(self):
+        analyzer = Analyzer(chunk_lines=5, chunk_workers=2)
+        chunks = analyzer._split_chunks(CHUNKED_MODULE)
+
+        def fake_chunk(source):
+            flake8 = [(2, (1, "F401 'sys' imported but unused"))]
+            if "def second" in source:
+                # Bandit chokes on one chunk only
+                return flake8 + [(7, (5, "E999 made up"))], ValueError("bad bandit output")
+            return flake8, [(6, ("HIGH", "made up"))]
+
+        with patch.object(analyzer, "_analyze_chunk", side_effect=fake_chunk):
+            lint_errors, (score, flags) = analyzer._analyze_chunks(chunks)
+
+        # Flake8 results from every chunk survive the Bandit failure
+        assert lint_errors == ["F401 'sys' imported but unused", "E999 made up"]
+        assert score == 30
+        assert flags == ["Security (HIGH): made up", "Security analysis failed: bad bandit output"]
+
+    def test_small_inputs_are_not_split(self):
+        analyzer = Analyzer(chunk_lines=5000, chunk_workers=4)
+        assert analyzer._split_chunks(CHUNKED_MODULE) == []
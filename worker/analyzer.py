@@ -1,17 +1,297 @@
+import ast
+import io
+import re
 import subprocess
 import tempfile
 import os
+import sys
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from shared.config import config
+
+# Nodes that add a branch to a function's cyclomatic complexity
+_BRANCH_NODES = (
+    ast.If, ast.IfExp, ast.For, ast.AsyncFor, ast.While, ast.ExceptHandler
+) + tuple(getattr(ast, name) for name in ("match_case",) if hasattr(ast, name))
+
+# Nodes that open a new indented block for nesting depth
+_NESTING_NODES = (
+    ast.If, ast.For, ast.AsyncFor, ast.While, ast.With, ast.AsyncWith, ast.Try
+) + tuple(getattr(ast, name) for name in ("Match", "TryStar") if hasattr(ast, name))
+
+class _AstVisitor:
+    """Walks the tree once, applying the logic rules and collecting per-function metrics.
+
+    Each node is visited exactly once, so the cost stays linear in file size.
+    The walk uses an explicit stack rather than recursion, so deeply nested
+    expressions (e.g. long generated `a + b + ...` chains) can't overflow
+    the interpreter's recursion limit.
+    """
+
+    def __init__(self):
+        self.risk = 0
+        self.flags = []
+        self.suggestions = []
+        self.functions = []
+        self._scope = []       # enclosing class/function names, for qualified names
+        self._function = None  # metrics dict of the innermost function
+        self._depth = 0        # block depth inside the innermost function
+        self._open_loops = []  # `while True` loops, as [node, has_break]
+        self._stack = []       # pending (callback, argument) pairs
+
+    def visit(self, tree):
+        self._stack.append((self._enter, tree))
+        while self._stack:
+            callback, argument = self._stack.pop()
+            callback(argument)
+
+    def _push_children(self, nodes):
+        # Reversed so children are entered in source order
+        self._stack.extend((self._enter, child) for child in reversed(list(nodes)))
+
+    def _enter(self, node):
+        self._check_rules(node)
+
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            self._enter_function(node)
+            return
+        if isinstance(node, ast.ClassDef):
+            self._scope.append(node.name)
+            self._stack.append((self._exit_scope, None))
+            self._push_children(ast.iter_child_nodes(node))
+            return
+
+        function = self._function
+        if function is not None:
+            if isinstance(node, _BRANCH_NODES):
+                function["complexity"] += 1
+            elif isinstance(node, ast.BoolOp):
+                function["complexity"] += len(node.values) - 1
+            elif isinstance(node, ast.comprehension):
+                function["complexity"] += 1 + len(node.ifs)
+
+        # Exit markers are pushed before the children so they run after them
+        if isinstance(node, _NESTING_NODES):
+            self._depth += 1
+            if function is not None:
+                function["nesting"] = max(function["nesting"], self._depth)
+            self._stack.append((self._shift_depth, -1))
+
+        if (
+            isinstance(node, ast.While)
+            and isinstance(node.test, ast.Constant) and node.test.value == True
+        ):
+            self._open_loops.append([node, False])
+            self._stack.append((self._exit_loop, None))
+
+        if isinstance(node, ast.If) and len(node.orelse) == 1 and isinstance(node.orelse[0], ast.If):
+            # `elif` parses as an If nested in orelse; keep it at the same depth
+            self._stack.append((self._shift_depth, 1))
+            self._stack.append((self._enter, node.orelse[0]))
+            self._stack.append((self._shift_depth, -1))
+            self._push_children([node.test] + node.body)
+        else:
+            self._push_children(ast.iter_child_nodes(node))
+
+    def _enter_function(self, node):
+        metrics = {
+            "name": ".".join(self._scope + [node.name]),
+            "line": node.lineno,
+            "complexity": 1,
+            "nesting": 0,
+            "length": (node.end_lineno or node.lineno) - node.lineno + 1,
+        }
+        self.functions.append(metrics)
+
+        self._stack.append((self._exit_function, (self._function, self._depth)))
+        self._function, self._depth = metrics, 0
+        self._scope.append(node.name)
+        self._push_children(ast.iter_child_nodes(node))
+
+    def _exit_function(self, outer):
+        self._scope.pop()
+        self._function, self._depth = outer
+
+    def _exit_scope(self, _):
+        self._scope.pop()
+
+    def _shift_depth(self, delta):
+        self._depth += delta
+
+    def _exit_loop(self, _):
+        _, has_break = self._open_loops.pop()
+        if not has_break:
+            self.risk += 30
+            self.flags.append("Logic: Potential infinite loop (while True without break)")
+            self.suggestions.append("Add a `break` statement inside the loop or use a condition variable.")
+
+    def _check_rules(self, node):
+        # Division by Zero
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Div):
+            if isinstance(node.right, ast.Constant) and node.right.value == 0:
+                self.risk += 50
+                self.flags.append("Logic: Division by Zero detected")
+                self.suggestions.append("Ensure the denominator is not zero.")
+
+        # A break anywhere inside counts for every enclosing `while True`
+        if isinstance(node, ast.Break):
+            for loop in self._open_loops:
+                loop[1] = True
+
+_LINE_REF = re.compile(r"\bline (\d+)")
+
+_DEF_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+def _top_level_names(node) -> set:
+    """Names a top-level statement binds in module scope (not inside nested defs)."""
+    if isinstance(node, _DEF_NODES):
+        return {node.name}
+    names = set()
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, _DEF_NODES):
+            names.add(current.name)
+            continue
+        if isinstance(current, (ast.Import, ast.ImportFrom)):
+            names.update(
+                alias.asname or alias.name.split(".")[0]
+                for alias in current.names if alias.name != "*"
+            )
+        elif isinstance(current, ast.Name) and isinstance(current.ctx, ast.Store):
+            names.add(current.id)
+        stack.extend(ast.iter_child_nodes(current))
+    return names
+
+def _split_module(code: str, parts: int) -> list:
+    """Splits a module into up to `parts` chunks at top-level definition boundaries.
+
+    Every chunk repeats the module header (everything before the first
+    def/class, i.e. imports and globals) and gets `name = None` stubs for
+    top-level names bound in other chunks, so flake8's name resolution sees
+    the same module scope as the whole file. Returns a list of
+    (source, header_lines, stub_lines, body_start) tuples, or [] if the
+    module can't be split.
+    """
+    tree = ast.parse(code)
+    lines = io.StringIO(code).readlines()
+    stmts = tree.body
+    def_indexes = [i for i, node in enumerate(stmts) if isinstance(node, _DEF_NODES)]
+    if len(def_indexes) < 2:
+        return []
+
+    first = def_indexes[0]
+    header_end = stmts[first - 1].end_lineno if first else 0
+    target = -(-(len(lines) - header_end) // parts)
+
+    # Each chunk starts right after the previous statement, so it keeps the
+    # blank lines and comments that lead into its first definition
+    starts = [header_end + 1]
+    for i in def_indexes[1:]:
+        start = stmts[i - 1].end_lineno + 1
+        if start - starts[-1] >= target and len(starts) < parts:
+            starts.append(start)
+    if len(starts) < 2:
+        return []
+    ends = [start - 1 for start in starts[1:]] + [len(lines)]
+
+    header_names = set()
+    for node in stmts[:first]:
+        header_names |= _top_level_names(node)
+    chunk_names = [set() for _ in starts]
+    chunk = 0
+    for node in stmts[first:]:
+        while node.end_lineno > ends[chunk]:
+            chunk += 1
+        chunk_names[chunk] |= _top_level_names(node)
+    all_names = set().union(*chunk_names)
+
+    header = "".join(lines[:header_end])
+    chunks = []
+    for start, end, names in zip(starts, ends, chunk_names):
+        stubs = sorted(all_names - names - header_names)
+        source = header + "".join(f"{name} = None\n" for name in stubs) + "".join(lines[start - 1:end])
+        chunks.append((source, header_end, len(stubs), start))
+    return chunks
+
+def _chunk_line(chunk: tuple, line: int):
+    """Maps a line in a chunk back to the original file; None for stub lines."""
+    _, header_lines, stub_lines, body_start = chunk
+    if line <= header_lines:
+        return line
+    if line <= header_lines + stub_lines:
+        return None
+    return body_start + line - header_lines - stub_lines - 1
+
+def _remap_message(chunk: tuple, message: str) -> str:
+    # Messages like "redefinition of unused 'x' from line 12" also refer to chunk lines
+    return _LINE_REF.sub(
+        lambda m: f"line {_chunk_line(chunk, int(m.group(1))) or m.group(1)}", message
+    )
+
+def _merge_chunk_issues(chunks: list, chunk_issues: list) -> list:
+    """Maps per-chunk (line, payload) issues back onto the original file.
+
+    Issues in the shared header are only kept if every chunk reports them,
+    e.g. an import is unused only if no chunk uses it. Issues on stub lines
+    are dropped.
+    """
+    header = None
+    merged = []
+    for chunk, issues in zip(chunks, chunk_issues):
+        chunk_header = set()
+        for line, payload in issues:
+            original = _chunk_line(chunk, line)
+            if line <= chunk[1]:
+                chunk_header.add((line, payload))
+            elif original is not None:
+                merged.append((original, payload))
+        header = chunk_header if header is None else header & chunk_header
+    return sorted(merged + list(header or ()))
+
+def _run_linter(lint, file_path: str):
+    try:
+        return lint(file_path)
+    except Exception as e:
+        return e
+
+def _split_failures(chunks: list, results: list) -> tuple:
+    """Separates one linter's per-chunk results into (chunks, issues, errors).
+
+    Errors are deduplicated, since every chunk tends to fail the same way.
+    """
+    ok = [(chunk, issues) for chunk, issues in zip(chunks, results) if not isinstance(issues, Exception)]
+    errors = dict.fromkeys(str(issues) for issues in results if isinstance(issues, Exception))
+    return [chunk for chunk, _ in ok], [issues for _, issues in ok], list(errors)
 
 class Analyzer:
-    def analyze(self, diff: str, language: str = "python"):
+    # Per-function limits; each function over a limit adds MAINTAINABILITY_RISK
+    COMPLEXITY_LIMIT = 10
+    NESTING_LIMIT = 4
+    LENGTH_LIMIT = 60
+    MAINTAINABILITY_RISK = 5
+    MAX_MAINTAINABILITY_RISK = 30
+
+    def __init__(self, chunk_lines: int = None, chunk_workers: int = None):
+        # Inputs longer than chunk_lines are split and linted in parallel
+        self.chunk_lines = chunk_lines or config.ANALYZER_CHUNK_LINES
+        self.chunk_workers = chunk_workers or config.ANALYZER_CHUNK_WORKERS
+
+    def analyze(self, diff: str, language: str = "python", timings: dict = None):
+        # Seconds spent per stage are written into `timings` if one is passed
+        timings = {} if timings is None else timings
+        clock = time.perf_counter()
+
         # 1. Static Analysis (Mock/Simple Wrapper)
         lint_errors = []
         if language == "python":
             
             # 1. AST Analysis
-            ast_risk, ast_flags, syntax_error, ast_suggestions = self._ast_check(diff)
+            ast_risk, ast_flags, syntax_error, ast_suggestions, metrics = self._ast_check(diff)
             suggestions = ast_suggestions
+            timings["ast"], clock = time.perf_counter() - clock, time.perf_counter()
             
             if syntax_error:
                 return {
@@ -19,21 +299,32 @@ class Analyzer:
                     "quality_score": 0,
                     "comments": [syntax_error],
                     "flags": ["Critical: Syntax Error (Code cannot run)"],
-                    "suggestions": suggestions
+                    "suggestions": suggestions,
+                    "metrics": []
                 }
 
-            # 2. Static Analysis (Flake8)
-            lint_errors, tmp_path = self._run_flake8(diff)
-            
-            # 3. Risk Classification
-            if tmp_path and os.path.exists(tmp_path):
-                risk_score, flags = self._assess_risk(diff, tmp_path)
-                os.remove(tmp_path) # Clean up after both checks
+            chunks = self._split_chunks(diff)
+            if chunks:
+                # Oversized input: Flake8 and Bandit run per chunk in parallel
+                lint_errors, bandit = self._analyze_chunks(chunks)
+                risk_score, flags = self._assess_risk(diff, None, metrics, bandit)
+                timings["chunks"] = time.perf_counter() - clock
             else:
-                 risk_score, flags = self._assess_risk(diff, None)
+                # 2. Static Analysis (Flake8)
+                lint_errors, tmp_path = self._run_flake8(diff)
+                timings["flake8"], clock = time.perf_counter() - clock, time.perf_counter()
+                
+                # 3. Risk Classification
+                if tmp_path and os.path.exists(tmp_path):
+                    risk_score, flags = self._assess_risk(diff, tmp_path, metrics)
+                    os.remove(tmp_path) # Clean up after both checks
+                else:
+                     risk_score, flags = self._assess_risk(diff, None, metrics)
+                timings["bandit"] = time.perf_counter() - clock
         else:
             risk_score, flags = self._assess_risk(diff, None)
             suggestions = []
+            metrics = []
         
         # Combine AST and Bandit results
         risk_score = max(risk_score, ast_risk) if language == "python" else risk_score
@@ -54,16 +345,12 @@ class Analyzer:
             "quality_score": quality_score,
             "comments": comments,
             "flags": flags,
-            "suggestions": suggestions
+            "suggestions": suggestions,
+            "metrics": metrics
         }
 
-    import sys
-    
     def _ast_check(self, code: str):
-        """Uses built-in AST to find logic errors and syntax crashes."""
-        import ast
-        risk = 0
-        flags = []
+        """Uses built-in AST to find logic errors, syntax crashes and per-function metrics."""
         suggestions = []
         try:
             tree = ast.parse(code)
@@ -77,33 +364,14 @@ class Analyzer:
                  if re.search(r'\b\d+\.(upper|lower)', code):
                      suggestions.append("You are trying to call a method on a number literal. Use parenthesis: `(5).upper()` or quotes: `'5'.upper()`.")
             
-            return 100, [], msg, suggestions
+            return 100, [], msg, suggestions, []
         except Exception as e:
-            return 100, [], f"Parse Error: {str(e)}", []
-
-        for node in ast.walk(tree):
-            # Division by Zero
-            if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Div):
-                if isinstance(node.right, ast.Constant) and node.right.value == 0:
-                    risk += 50
-                    flags.append("Logic: Division by Zero detected")
-                    suggestions.append("Ensure the denominator is not zero.")
-            
-            # Infinite Loop patterns (heuristic)
-            if isinstance(node, ast.While):
-                if isinstance(node.test, ast.Constant) and node.test.value == True:
-                    # Check if break exists
-                    has_break = False
-                    for child in ast.walk(node):
-                        if isinstance(child, ast.Break):
-                            has_break = True
-                            break
-                    if not has_break:
-                        risk += 30
-                        flags.append("Logic: Potential infinite loop (while True without break)")
-                        suggestions.append("Add a `break` statement inside the loop or use a condition variable.")
-
-        return risk, flags, None, suggestions
+            return 100, [], f"Parse Error: {str(e)}", [], []
+
+        visitor = _AstVisitor()
+        visitor.visit(tree)
+
+        return visitor.risk, visitor.flags, None, visitor.suggestions, visitor.functions
 
     def _run_flake8(self, code: str) -> tuple:
         # Create a temp file to run flake8 on
@@ -112,66 +380,143 @@ class Analyzer:
             tmp_path = tmp.name
             
         try:
-            # Run flake8 using python -m to avoid PATH issues
-            result = subprocess.run(
-                [sys.executable, '-m', 'flake8', tmp_path, '--format=default'], 
-                capture_output=True, 
-                text=True
-            )
-            
-            # Parse output
-            errors = []
-            if result.stdout:
-                for line in result.stdout.splitlines():
-                    # Format: /tmp/file.py:1:1: E123 error
-                    parts = line.split(':', 3)
-                    if len(parts) >= 4:
-                        errors.append(parts[3].strip())
+            errors = [message for _, (_, message) in self._flake8_issues(tmp_path)]
             return errors, tmp_path
         except Exception as e:
             if os.path.exists(tmp_path):
                 os.remove(tmp_path)
             return [f"Static analysis failed: {str(e)}"], None
 
+    def _flake8_issues(self, file_path: str) -> list:
+        """Runs flake8 on a file and returns (line, (column, message)) tuples."""
+        # Run flake8 using python -m to avoid PATH issues
+        result = subprocess.run(
+            [sys.executable, '-m', 'flake8', file_path, '--format=default'], 
+            capture_output=True, 
+            text=True
+        )
+        
+        # Parse output
+        issues = []
+        if result.stdout:
+            for line in result.stdout.splitlines():
+                # Format: /tmp/file.py:1:1: E123 error
+                parts = line.split(':', 3)
+                if len(parts) >= 4:
+                    issues.append((int(parts[1]), (int(parts[2]), parts[3].strip())))
+        return issues
+
     def _run_bandit(self, file_path: str) -> tuple:
         """Runs bandit for security analysis."""
         try:
-            # -ll: report only medium and high severity
-            # -f json: output in json format
-            result = subprocess.run(
-                [sys.executable, '-m', 'bandit', '-f', 'json', '-ll', file_path],
-                capture_output=True,
-                text=True
-            )
-            
-            # Bandit returns exit code 1 if issues are found, so we don't check returncode check for success
-            
-            output = json.loads(result.stdout)
-            issues = []
-            score_impact = 0
+            return self._score_bandit(self._bandit_issues(file_path))
+        except Exception as e:
+            return 0, [f"Security analysis failed: {str(e)}"]
+
+    def _bandit_issues(self, file_path: str) -> list:
+        """Runs bandit on a file and returns (line, (severity, text)) tuples."""
+        # -ll: report only medium and high severity
+        # -f json: output in json format
+        result = subprocess.run(
+            [sys.executable, '-m', 'bandit', '-f', 'json', '-ll', file_path],
+            capture_output=True,
+            text=True
+        )
+        
+        # Bandit returns exit code 1 if issues are found, so we don't check returncode check for success
+        
+        output = json.loads(result.stdout)
+        return [
+            (issue.get('line_number', 0), (issue['issue_severity'], issue['issue_text']))
+            for issue in output.get('results', [])
+        ]
+
+    def _score_bandit(self, issues: list) -> tuple:
+        flags = []
+        score_impact = 0
+        for _, (severity, text) in issues:
+            flags.append(f"Security ({severity}): {text}")
             
-            results = output.get('results', [])
-            for issue in results:
-                severity = issue['issue_severity']
-                msg = f"Security ({severity}): {issue['issue_text']}"
-                issues.append(msg)
+            if severity == 'HIGH':
+                score_impact += 30
+            elif severity == 'MEDIUM':
+                score_impact += 15
                 
-                if severity == 'HIGH':
-                    score_impact += 30
-                elif severity == 'MEDIUM':
-                    score_impact += 15
-                    
-            return score_impact, issues
-            
+        return score_impact, flags
+
+    def _split_chunks(self, code: str) -> list:
+        if self.chunk_workers < 2 or code.count("\n") < self.chunk_lines:
+            return []
+        # This re-parses the module, but only for oversized inputs where the
+        # linters dominate the cost anyway
+        return _split_module(code, self.chunk_workers)
+
+    def _analyze_chunk(self, source: str) -> tuple:
+        """Lints one chunk, returning (flake8, bandit) issue lists.
+
+        A linter that fails yields its exception in place of the list, so it
+        doesn't take down the other linter or the other chunks.
+        """
+        try:
+            with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as tmp:
+                tmp.write(source)
+                tmp_path = tmp.name
         except Exception as e:
-            return 0, [f"Security analysis failed: {str(e)}"]
+            return e, e
+        try:
+            return _run_linter(self._flake8_issues, tmp_path), _run_linter(self._bandit_issues, tmp_path)
+        finally:
+            os.remove(tmp_path)
+
+    def _analyze_chunks(self, chunks: list) -> tuple:
+        """Lints chunks concurrently and merges the results.
+
+        Flake8 and Bandit already run as subprocesses, so a thread per chunk
+        is enough to spread them across cores. Returns (lint_errors, (bandit_score, bandit_flags)).
+        Failures are reported per linter, like the unchunked path, and the
+        chunks that did succeed are still merged.
+        """
+        with ThreadPoolExecutor(max_workers=self.chunk_workers) as executor:
+            results = list(executor.map(self._analyze_chunk, [chunk[0] for chunk in chunks]))
+
+        flake8_chunks, flake8_results, flake8_failures = _split_failures(chunks, [f for f, _ in results])
+        flake8_issues = [
+            [(line, (column, _remap_message(chunk, message))) for line, (column, message) in flake8]
+            for chunk, flake8 in zip(flake8_chunks, flake8_results)
+        ]
+        lint_issues = _merge_chunk_issues(flake8_chunks, flake8_issues)
+        lint_errors = [message for _, (_, message) in lint_issues]
+        lint_errors += [f"Static analysis failed: {e}" for e in flake8_failures]
+
+        bandit_chunks, bandit_results, bandit_failures = _split_failures(chunks, [b for _, b in results])
+        score, flags = self._score_bandit(_merge_chunk_issues(bandit_chunks, bandit_results))
+        flags += [f"Security analysis failed: {e}" for e in bandit_failures]
+        return lint_errors, (score, flags)
+
+    def _assess_maintainability(self, metrics: list) -> tuple:
+        """Scores the per-function metrics gathered during the AST pass."""
+        risk_score = 0
+        flags = []
+        for function in metrics:
+            for key, limit, label in (
+                ("complexity", self.COMPLEXITY_LIMIT, "cyclomatic complexity"),
+                ("nesting", self.NESTING_LIMIT, "nesting depth"),
+                ("length", self.LENGTH_LIMIT, "length"),
+            ):
+                if function[key] > limit:
+                    risk_score += self.MAINTAINABILITY_RISK
+                    flags.append(
+                        f"Maintainability: `{function['name']}` (line {function['line']}) "
+                        f"has {label} {function[key]} (>{limit})"
+                    )
+        return min(risk_score, self.MAX_MAINTAINABILITY_RISK), flags
 
-    def _assess_risk(self, diff: str, tmp_path: str) -> tuple:
+    def _assess_risk(self, diff: str, tmp_path: str, metrics: list = None, bandit: tuple = None) -> tuple:
         risk_score = 0
         flags = []
         
-        # 1. Run Bandit (Security)
-        bandit_score, bandit_flags = self._run_bandit(tmp_path)
+        # 1. Run Bandit (Security), unless the chunked path already did
+        bandit_score, bandit_flags = bandit if bandit is not None else self._run_bandit(tmp_path)
         risk_score += bandit_score
         flags.extend(bandit_flags)
         
@@ -187,8 +532,13 @@ class Analyzer:
                 risk_score += 30
                 flags.append("Security: Potential sensitive data hardcoded")
             
-        # Complexity heuristic (length-based)
-        if len(diff.splitlines()) > 100:
+        # Complexity: per-function metrics when we have a parse tree,
+        # otherwise fall back to a length-based heuristic
+        if metrics is not None:
+            maintainability_score, maintainability_flags = self._assess_maintainability(metrics)
+            risk_score += maintainability_score
+            flags.extend(maintainability_flags)
+        elif len(diff.splitlines()) > 100:
             risk_score += 10
             flags.append("Maintainability: Large change set (>100 lines)")
             
@@ -0,0 +1,187 @@
+"""Offline scanner: runs the Analyzer over files on disk, no Redis or API needed.
+
+    python worker/cli.py path/to/project
+    python worker/cli.py --git-diff main...HEAD --cache-dir .review-cache
+
+Results are streamed to stdout as JSON Lines, one object per file, in the
+order files finish.
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worker.analyzer import Analyzer
+
+# Bump whenever Analyzer output changes so stale cache entries are ignored
+CACHE_VERSION = 2
+
+SKIP_DIRS = {"__pycache__", "node_modules", "venv", "build", "dist"}
+
+_analyzer = None
+
+def _get_analyzer() -> Analyzer:
+    # One Analyzer per pool process, created on first use. The pool already
+    # uses every core, so don't also split large files across workers.
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = Analyzer(chunk_workers=1)
+    return _analyzer
+
+def iter_python_files(root: str):
+    """Yields every .py file under root, skipping hidden and build directories."""
+    if os.path.isfile(root):
+        yield root
+        return
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(
+            d for d in dirnames if d not in SKIP_DIRS and not d.startswith(".")
+        )
+        for name in sorted(filenames):
+            if name.endswith(".py"):
+                yield os.path.join(dirpath, name)
+
+def _git(repo: str, *args) -> str:
+    return subprocess.run(
+        ["git", "-C", repo, *args], capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+def git_changed_files(rev_range: str, repo: str = ".") -> list:
+    """Returns (path, revision, toplevel) tasks for .py files changed in a range.
+
+    BASE..HEAD compares the two revisions; BASE...HEAD compares HEAD with its
+    merge base with BASE, as CI systems usually mean it. Without a HEAD
+    revision, files are compared against and read from the working tree, so
+    the revision is None. Raises CalledProcessError if git rejects the range.
+    """
+    toplevel = _git(repo, "rev-parse", "--show-toplevel")
+    if "..." in rev_range:
+        base, _, head = rev_range.partition("...")
+        base = _git(toplevel, "merge-base", base, head or "HEAD")
+    else:
+        base, _, head = rev_range.partition("..")
+
+    cmd = ["diff", "--name-only", "--diff-filter=d", base]
+    if head:
+        cmd.append(head)
+    output = _git(toplevel, *cmd, "--", "*.py")
+
+    return [
+        (os.path.join(toplevel, line), head or None, toplevel)
+        for line in output.splitlines() if line.strip()
+    ]
+
+def _read_source(path: str, revision: str = None, toplevel: str = None) -> bytes:
+    if revision is None:
+        with open(path, "rb") as f:
+            return f.read()
+    # The file's directory may not exist in the working tree, so resolve
+    # the path from the repository root instead
+    relpath = os.path.relpath(path, toplevel).replace(os.sep, "/")
+    return subprocess.run(
+        ["git", "-C", toplevel, "show", f"{revision}:{relpath}"],
+        capture_output=True, check=True
+    ).stdout
+
+def _cache_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, key[:2], f"{key}.json")
+
+def _load_cached(cache_dir: str, key: str):
+    try:
+        with open(_cache_path(cache_dir, key)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _store_cached(cache_dir: str, key: str, result: dict):
+    path = _cache_path(cache_dir, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write then rename so concurrent scans never read a half-written entry
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(result, f)
+    os.replace(tmp_path, path)
+
+def scan_file(task: tuple, language: str = "python", cache_dir: str = None) -> dict:
+    """Analyzes one (path, revision, toplevel) task; runs inside a pool process."""
+    path, revision, toplevel = task
+    try:
+        source = _read_source(path, revision, toplevel)
+    except (OSError, subprocess.CalledProcessError) as e:
+        return {"path": path, "error": f"Could not read file: {e}"}
+
+    key = hashlib.sha256(
+        f"{CACHE_VERSION}:{language}:".encode() + source
+    ).hexdigest()
+    if cache_dir:
+        cached = _load_cached(cache_dir, key)
+        if cached is not None:
+            return {"path": path, "cached": True, **cached}
+
+    try:
+        result = _get_analyzer().analyze(source.decode("utf-8", errors="replace"), language)
+    except Exception as e:
+        # One bad file shouldn't abort a scan of the whole tree
+        return {"path": path, "error": f"Analysis failed: {type(e).__name__}: {e}"}
+    if cache_dir:
+        _store_cached(cache_dir, key, result)
+    return {"path": path, "cached": False, **result}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the code review analyzer offline.")
+    parser.add_argument("paths", nargs="*", help="Files or directories to scan")
+    parser.add_argument("--git-diff", metavar="BASE[..HEAD|...HEAD]",
+                        help="Scan .py files changed between two revisions")
+    parser.add_argument("--repo", default=".", help="Repository used with --git-diff")
+    parser.add_argument("--language", default="python")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="Worker processes (default: all cores)")
+    parser.add_argument("--cache-dir", help="Reuse results for unchanged file contents")
+    parser.add_argument("--fail-risk", type=int, metavar="SCORE",
+                        help="Exit with status 1 if any file reaches this risk score")
+    parser.add_argument("--fail-on-error", action="store_true",
+                        help="Exit with status 1 if any file could not be read or analyzed")
+    args = parser.parse_args(argv)
+
+    if not args.paths and not args.git_diff:
+        parser.error("give at least one path or --git-diff")
+
+    tasks = []
+    if args.git_diff:
+        try:
+            tasks.extend(git_changed_files(args.git_diff, args.repo))
+        except subprocess.CalledProcessError as e:
+            parser.error(f"--git-diff {args.git_diff}: {e.stderr.strip() or e}")
+    for root in args.paths:
+        tasks.extend((path, None, None) for path in iter_python_files(root))
+
+    worker = functools.partial(scan_file, language=args.language, cache_dir=args.cache_dir)
+    failed = False
+    scanned = cached = errors = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = [executor.submit(worker, task) for task in tasks]
+        for future in as_completed(futures):
+            record = future.result()
+            scanned += 1
+            cached += bool(record.get("cached"))
+            if "error" in record:
+                errors += 1
+                if args.fail_on_error:
+                    failed = True
+            if args.fail_risk is not None and record.get("risk_score", 0) >= args.fail_risk:
+                failed = True
+            sys.stdout.write(json.dumps(record) + "\n")
+            sys.stdout.flush()
+
+    print(f"Scanned {scanned} files ({cached} from cache, {errors} errors).", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import os
+import socket
+import threading
+import time
+
+from shared.config import config
+
+class Heartbeat:
+    """Tracks what this worker is doing and publishes it to Redis.
+
+    Publishing runs on a background thread so a long job doesn't make the
+    worker look dead. The API's /stats endpoint aggregates the heartbeats.
+    """
+
+    def __init__(self, client, worker_id: str = None, interval: float = None):
+        self.client = client
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.interval = interval or config.HEARTBEAT_INTERVAL
+        self.started_at = time.time()
+        self.jobs_completed = 0
+        self.busy_seconds = 0.0
+        self.current_job = None
+        self.last_queue_lag = None
+        self._job_started = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def job_started(self, submission_id: str, enqueued_at: float = None):
+        now = time.time()
+        with self._lock:
+            self.current_job = submission_id
+            self._job_started = now
+            if enqueued_at is not None:
+                self.last_queue_lag = now - enqueued_at
+
+    def job_finished(self):
+        now = self._end_job(completed=True)
+
+        # Per-minute completion counters give the API a fleet-wide drain rate
+        key = f"{config.COMPLETED_COUNTER_PREFIX}{int(now // 60)}"
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.incr(key)
+            pipe.expire(key, config.STATS_WINDOW_MINUTES * 60 * 2)
+            pipe.execute()
+        except Exception as e:
+            print(f"Could not record completion: {e}")
+
+    def job_failed(self):
+        # Time spent on failed attempts still counts as busy, so the mean job
+        # time reflects what a job costs once its retries are included
+        self._end_job(completed=False)
+
+    def _end_job(self, completed: bool) -> float:
+        now = time.time()
+        with self._lock:
+            if self._job_started is not None:
+                self.busy_seconds += now - self._job_started
+            if completed:
+                self.jobs_completed += 1
+            self.current_job = None
+            self._job_started = None
+        return now
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        with self._lock:
+            busy = self.busy_seconds
+            if self._job_started is not None:
+                busy += now - self._job_started
+            return {
+                "worker_id": self.worker_id,
+                "current_job": self.current_job or "",
+                "jobs_completed": self.jobs_completed,
+                "busy_seconds": round(busy, 3),
+                "idle_seconds": round(max(0.0, now - self.started_at - busy), 3),
+                "last_queue_lag": "" if self.last_queue_lag is None else round(self.last_queue_lag, 3),
+                "started_at": self.started_at,
+                "last_seen": now,
+            }
+
+    def publish(self):
+        state = self.snapshot()
+        key = f"{config.WORKER_KEY_PREFIX}{self.worker_id}"
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hset(key, mapping=state)
+        pipe.expire(key, config.HEARTBEAT_TTL)
+        pipe.zadd(config.WORKERS_KEY, {self.worker_id: state["last_seen"]})
+        pipe.execute()
+
+    def start(self):
+        self._publish_safely()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        # Leave the fleet immediately instead of waiting for the TTL
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.delete(f"{config.WORKER_KEY_PREFIX}{self.worker_id}")
+            pipe.zrem(config.WORKERS_KEY, self.worker_id)
+            pipe.execute()
+        except Exception as e:
+            print(f"Could not deregister worker: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._publish_safely()
+
+    def _publish_safely(self):
+        try:
+            self.publish()
+        except Exception as e:
+            # A missed heartbeat is fine; the next one catches up
+            print(f"Heartbeat failed: {e}")
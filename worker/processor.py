@@ -2,46 +2,229 @@ import json
 import time
 import sys
 import os
+import signal
+import threading
+import traceback
 
 # Add parent directory to path to import shared modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from shared.config import config
-from shared.redis_client import get_redis_client
+from shared.redis_client import get_redis_client, stamp_result
+from shared.serialization import encode_result
 from analyzer import Analyzer
+from heartbeat import Heartbeat
+from profiler import JobProfiler
 
 redis_client = get_redis_client()
 analyzer = Analyzer()
+heartbeat = Heartbeat(redis_client)
+profiler = JobProfiler(redis_client)
+
+# Jobs this worker has claimed but not yet finished
+processing_key = f"{config.PROCESSING_KEY_PREFIX}{heartbeat.worker_id}"
+
+# Set on SIGTERM; the worker finishes its current job and then exits
+stopping = threading.Event()
+
+# Moves retries whose backoff has elapsed back onto the main queue. Atomic,
+# so several workers can run it without double-queueing a job.
+PROMOTE_RETRIES_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 100)
+for _, job in ipairs(due) do
+    redis.call('RPUSH', KEYS[2], job)
+    redis.call('ZREM', KEYS[1], job)
+end
+return #due
+"""
+
+# Puts a worker's claimed jobs back at the head of the queue, in order. The
+# lost run counts as an attempt, so a job that keeps killing its worker ends
+# up dead-lettered instead of cycling forever.
+REQUEUE_CLAIMED_SCRIPT = """
+local moved = 0
+while true do
+    local data = redis.call('RPOP', KEYS[1])
+    if not data then break end
+    local ok, job = pcall(cjson.decode, data)
+    if ok and type(job) == 'table' and job['id'] ~= nil then
+        job['attempts'] = (tonumber(job['attempts']) or 0) + 1
+        data = cjson.encode(job)
+    end
+    redis.call('LPUSH', KEYS[2], data)
+    moved = moved + 1
+end
+return moved
+"""
+
+# Records a dead-lettered job in one atomic step: appends the entry, trims
+# the list, releases the worker's claim and, if the job has a submission id
+# (KEYS[4]), stamps its result failed like stamp_result does. A crash can't
+# leave the job both dead-lettered and claimed, so it is never requeued
+# and dead-lettered twice.
+DEAD_LETTER_SCRIPT = """
+redis.call('RPUSH', KEYS[1], ARGV[1])
+redis.call('LTRIM', KEYS[1], -tonumber(ARGV[2]), -1)
+redis.call('LREM', KEYS[2], 1, ARGV[3])
+if KEYS[4] then
+    local version = redis.call('INCR', KEYS[3])
+    redis.call('HSET', KEYS[4], 'version', version, 'status', 'failed',
+               'submission_id', ARGV[4], 'error', ARGV[5])
+end
+return 1
+"""
 
 def process_jobs():
-    print("Worker started. Waiting for jobs...")
-    while True:
-        # BLPOP blocks until an item is available
-        # It returns a tuple (queue_name, data)
-        queue_name, data = redis_client.blpop(config.SUBMISSION_QUEUE)
-        
-        if data:
-            job = json.loads(data)
-            submission_id = job['id']
-            diff = job['diff']
-            language = job.get('language', 'python')
-            
-            print(f"Processing job {submission_id}...")
-            
-            # Run analysis
-            results = analyzer.analyze(diff, language)
-            
-            # Save results
-            redis_client.hset(f"result:{submission_id}", mapping={
-                "status": "completed",
-                "submission_id": submission_id,
-                "risk_score": results['risk_score'],
-                "quality_score": results['quality_score'],
-                "comments": json.dumps(results['comments']),
-                "flags": json.dumps(results['flags']),
-                "suggestions": json.dumps(results.get('suggestions', []))
-            })
-            print(f"Job {submission_id} completed.")
+    print(f"Worker {heartbeat.worker_id} started. Waiting for jobs...")
+    signal.signal(signal.SIGTERM, _request_stop)
+    heartbeat.start()
+    try:
+        _drain_queue()
+    finally:
+        heartbeat.stop()
+    print(f"Worker {heartbeat.worker_id} stopped.")
+
+def _request_stop(signum, frame):
+    print("Shutdown requested; finishing current job...")
+    stopping.set()
+
+def _drain_queue():
+    next_recovery = 0
+    while not stopping.is_set():
+        # Nothing a single job does may stop the loop; if Redis itself is
+        # down, back off briefly and keep trying
+        try:
+            if time.monotonic() >= next_recovery:
+                _requeue_orphans()
+                next_recovery = time.monotonic() + config.HEARTBEAT_TTL
+            _poll_once()
+        except Exception as e:
+            print(f"Worker loop error: {e}")
+            # A job whose outcome couldn't be written is still claimed;
+            # put it back as soon as Redis answers again
+            next_recovery = 0
+            time.sleep(1)
+
+def _requeue_orphans():
+    """Requeues jobs claimed by dead workers, and any this worker abandoned."""
+    cutoff = time.time() - config.HEARTBEAT_TTL
+    for key in redis_client.scan_iter(match=f"{config.PROCESSING_KEY_PREFIX}*"):
+        worker_id = key[len(config.PROCESSING_KEY_PREFIX):]
+        if key != processing_key:
+            last_seen = redis_client.zscore(config.WORKERS_KEY, worker_id)
+            if last_seen is not None and last_seen >= cutoff:
+                continue
+        moved = redis_client.eval(REQUEUE_CLAIMED_SCRIPT, 2, key, config.SUBMISSION_QUEUE)
+        if moved:
+            print(f"Requeued {moved} job(s) claimed by worker {worker_id}.")
+
+def _poll_once():
+    redis_client.eval(
+        PROMOTE_RETRIES_SCRIPT, 2,
+        config.RETRY_QUEUE, config.SUBMISSION_QUEUE, time.time()
+    )
+
+    # BLMOVE blocks until an item is available or the timeout passes, so
+    # due retries are picked up even when the queue is idle. The job moves
+    # atomically into this worker's processing list and is only removed once
+    # its result, retry or dead-letter entry is written, so a crash can't
+    # lose it.
+    data = redis_client.blmove(
+        config.SUBMISSION_QUEUE, processing_key, config.WORKER_POLL_TIMEOUT, "LEFT", "RIGHT"
+    )
+    if data is not None:
+        _handle_job(data)
+        redis_client.lrem(processing_key, 1, data)
+
+def _handle_job(data):
+    job = None
+    try:
+        job = json.loads(data)
+        submission_id = job['id']
+        diff = job['diff']
+    except (ValueError, TypeError, KeyError) as e:
+        # Malformed payloads will never succeed, so skip the retries. Keep
+        # the parsed job if there is one so its submission is marked failed.
+        print(f"Discarding malformed job: {e}")
+        _dead_letter(data, job if isinstance(job, dict) else data, e, attempts=1)
+        return
+    language = job.get('language', 'python')
+
+    attempts = job.get('attempts', 0)
+    if attempts > config.JOB_MAX_RETRIES:
+        # Only requeued orphans get here: workers kept dying mid-job
+        _dead_letter(data, job, RuntimeError("Worker died while processing the job"), attempts)
+        return
+
+    print(f"Processing job {submission_id}...")
+    heartbeat.job_started(submission_id, job.get('enqueued_at'))
+    try:
+        with profiler.job(submission_id, diff) as timings:
+            _process_job(submission_id, diff, language, timings)
+    except Exception as e:
+        heartbeat.job_failed()
+        print(f"Job {submission_id} failed: {e}")
+        _retry_or_fail(data, job, e)
+    else:
+        heartbeat.job_finished()
+        print(f"Job {submission_id} completed.")
+
+def _retry_or_fail(claim, job, error):
+    attempts = job.get('attempts', 0) + 1
+    if attempts > config.JOB_MAX_RETRIES:
+        _dead_letter(claim, job, error, attempts)
+        return
+
+    delay = min(config.JOB_RETRY_BACKOFF * 2 ** (attempts - 1), config.JOB_RETRY_MAX_BACKOFF)
+    redis_client.zadd(config.RETRY_QUEUE, {json.dumps({**job, 'attempts': attempts}): time.time() + delay})
+    print(f"Job {job['id']} will retry in {delay:.0f}s (attempt {attempts}/{config.JOB_MAX_RETRIES}).")
+
+def _dead_letter(claim, job, error, attempts):
+    """Parks a job that can't be processed and tells pollers it failed.
+
+    `claim` is the payload as claimed from the queue; it's released in the
+    same step.
+    """
+    entry = {
+        "job": job,
+        "error": f"{type(error).__name__}: {error}",
+        "traceback": "".join(traceback.format_exception(type(error), error, error.__traceback__)),
+        "attempts": attempts,
+        "failed_at": time.time()
+    }
+    keys = [config.DEAD_LETTER_QUEUE, processing_key, config.RESULT_VERSION_KEY]
+    args = [json.dumps(entry), config.DEAD_LETTER_MAX, claim]
+    if isinstance(job, dict) and isinstance(job.get('id'), str):
+        keys.append(f"result:{job['id']}")
+        args += [job['id'], entry["error"]]
+    redis_client.eval(DEAD_LETTER_SCRIPT, len(keys), *keys, *args)
+    print(f"Job moved to dead-letter queue after {attempts} attempt(s).")
+
+def _process_job(submission_id, diff, language, timings):
+    # Run analysis
+    results = analyzer.analyze(diff, language, timings)
+
+    # Serialize the response body once; the API serves it verbatim
+    body, etag = encode_result({
+        "submission_id": submission_id,
+        "status": "completed",
+        "risk_score": results['risk_score'],
+        "quality_score": results['quality_score'],
+        "comments": results['comments'],
+        "flags": results['flags'],
+        "suggestions": results.get('suggestions', []),
+        "metrics": results.get('metrics', [])
+    })
+
+    # Save results
+    clock = time.perf_counter()
+    stamp_result(redis_client, submission_id, {
+        "status": "completed",
+        "submission_id": submission_id,
+        "body": body,
+        "etag": etag
+    })
+    timings["redis"] = time.perf_counter() - clock
 
 if __name__ == "__main__":
     process_jobs()
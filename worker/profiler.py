@@ -0,0 +1,81 @@
+import cProfile
+import io
+import pstats
+import random
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+import orjson
+
+from shared.config import config
+
+class JobProfiler:
+    """Profiles a sampled fraction of jobs and keeps the slowest ones in Redis.
+
+    Profiles live in one sorted set scored by duration and trimmed to the
+    top PROFILE_KEEP entries, so storage stays bounded. With sampling off,
+    a job only pays for one random() call.
+    """
+
+    def __init__(self, client, sample_rate: float = None, memory: bool = None, keep: int = None):
+        self.client = client
+        self.sample_rate = config.PROFILE_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.memory = config.PROFILE_MEMORY if memory is None else memory
+        self.keep = keep or config.PROFILE_KEEP
+
+    @contextmanager
+    def job(self, submission_id: str, diff: str):
+        """Wraps one job; yields a dict for per-stage timings in seconds."""
+        timings = {}
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            yield timings
+            return
+
+        if self.memory:
+            tracemalloc.start()
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            yield timings
+        finally:
+            profile.disable()
+            duration = time.perf_counter() - started
+            memory = None
+            if self.memory:
+                memory = self._memory_report()
+                tracemalloc.stop()
+            self._save(submission_id, diff, duration, timings, profile, memory)
+
+    def _memory_report(self) -> dict:
+        _, peak = tracemalloc.get_traced_memory()
+        top = tracemalloc.take_snapshot().statistics("lineno")[:config.PROFILE_TOP_ENTRIES]
+        return {
+            "peak_bytes": peak,
+            "top_allocations": [str(stat) for stat in top],
+        }
+
+    def _save(self, submission_id, diff, duration, timings, profile, memory):
+        stream = io.StringIO()
+        pstats.Stats(profile, stream=stream).sort_stats("cumulative").print_stats(config.PROFILE_TOP_ENTRIES)
+        record = {
+            "profile_id": uuid.uuid4().hex,
+            "submission_id": submission_id,
+            "recorded_at": time.time(),
+            "duration": duration,
+            "input_bytes": len(diff.encode()),
+            "input_lines": diff.count("\n") + 1,
+            "timings": timings,
+            "stats": stream.getvalue(),
+            "memory": memory,
+        }
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.zadd(config.PROFILES_KEY, {orjson.dumps(record): duration})
+            # Keep only the slowest N
+            pipe.zremrangebyrank(config.PROFILES_KEY, 0, -(self.keep + 1))
+            pipe.execute()
+        except Exception as e:
+            print(f"Could not store profile for {submission_id}: {e}")
@@ -0,0 +1,161 @@
+"""Autoscaling supervisor: keeps enough processor.py workers running for the queue.
+
+    python worker/supervisor.py
+
+Every SCALE_INTERVAL seconds it looks at queue depth, the arrival rate and
+the fleet's mean job time, and spawns or drains workers between
+SUPERVISOR_MIN_WORKERS and SUPERVISOR_MAX_WORKERS. Drained workers get
+SIGTERM and finish their current job before exiting.
+"""
+import math
+import os
+import signal
+import subprocess
+import sys
+import time
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.config import config
+from shared.redis_client import get_redis_client
+
+PROCESSOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "processor.py")
+
+def desired_workers(queue_depth: int, arrival_rate: float, mean_job_seconds: float) -> int:
+    """Workers needed to keep up with arrivals and clear the backlog in time.
+
+    Steady state follows Little's law (arrival rate x job time, plus
+    headroom); the backlog term sizes the fleet to drain the current queue
+    within SCALE_TARGET_DRAIN_SECONDS. The result is clamped to the
+    configured minimum and maximum.
+    """
+    steady = arrival_rate * mean_job_seconds * config.SCALE_HEADROOM
+    backlog = queue_depth * mean_job_seconds / config.SCALE_TARGET_DRAIN_SECONDS
+    wanted = math.ceil(steady + backlog)
+    return max(config.SUPERVISOR_MIN_WORKERS, min(config.SUPERVISOR_MAX_WORKERS, wanted))
+
+class Supervisor:
+    def __init__(self, client):
+        self.client = client
+        self.workers = []    # running Popen handles, oldest first
+        self.draining = []   # sent SIGTERM, waiting for them to exit
+        self.arrival_rate = None
+        self._last_depth = None
+        self._last_tick = None
+        self._completed = {}  # per-minute completion counters seen last tick
+        self._low_since = None
+        self._stopping = False
+
+    def observe(self) -> dict:
+        """Samples queue depth, arrival rate and mean job time from Redis."""
+        now = time.time()
+        minute = int(now // 60)
+        minutes = [minute - 1, minute]
+
+        pipe = self.client.pipeline(transaction=False)
+        pipe.llen(config.SUBMISSION_QUEUE)
+        pipe.zcard(config.RETRY_QUEUE)
+        pipe.mget([f"{config.COMPLETED_COUNTER_PREFIX}{m}" for m in minutes])
+        pipe.zrangebyscore(config.WORKERS_KEY, now - config.HEARTBEAT_TTL, "+inf")
+        depth, retry_depth, counters, worker_ids = pipe.execute()
+
+        pipe = self.client.pipeline(transaction=False)
+        for worker_id in worker_ids:
+            pipe.hmget(f"{config.WORKER_KEY_PREFIX}{worker_id}", "busy_seconds", "jobs_completed")
+        heartbeats = pipe.execute() if worker_ids else []
+
+        busy = sum(float(b or 0) for b, _ in heartbeats)
+        jobs = sum(int(j or 0) for _, j in heartbeats)
+        mean_job_seconds = busy / jobs if jobs else config.DEFAULT_JOB_SECONDS
+
+        # Arrivals = jobs finished since last tick + growth of the queue
+        counts = {m: int(c or 0) for m, c in zip(minutes, counters)}
+        completed = sum(count - self._completed.get(m, 0) for m, count in counts.items())
+        self._completed = counts
+        if self._last_tick is not None:
+            elapsed = max(now - self._last_tick, 1e-6)
+            sample = max(0.0, (completed + depth - self._last_depth) / elapsed)
+            # Smooth out bursts so one busy tick doesn't whipsaw the fleet
+            self.arrival_rate = sample if self.arrival_rate is None else 0.3 * sample + 0.7 * self.arrival_rate
+        self._last_depth = depth
+        self._last_tick = now
+
+        return {
+            "queue_depth": depth + retry_depth,
+            "arrival_rate": self.arrival_rate or 0.0,
+            "mean_job_seconds": mean_job_seconds,
+        }
+
+    def reconcile(self, observed: dict):
+        self._reap()
+        current = len(self.workers)
+        target = desired_workers(**observed)
+        reason = (
+            f"depth={observed['queue_depth']} arrival={observed['arrival_rate']:.2f}/s "
+            f"mean_job={observed['mean_job_seconds']:.2f}s desired={target}"
+        )
+
+        if target > current:
+            self._low_since = None
+            print(f"Scaling up {current} -> {target} ({reason})", flush=True)
+            for _ in range(target - current):
+                self._spawn()
+        elif target < current:
+            now = time.time()
+            if self._low_since is None:
+                self._low_since = now
+            if now - self._low_since >= config.SCALE_DOWN_COOLDOWN:
+                print(f"Scaling down {current} -> {target} ({reason})", flush=True)
+                for _ in range(current - target):
+                    self._drain(self.workers.pop())
+                self._low_since = None
+        else:
+            self._low_since = None
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        print(
+            f"Supervisor started ({config.SUPERVISOR_MIN_WORKERS}-"
+            f"{config.SUPERVISOR_MAX_WORKERS} workers).", flush=True
+        )
+        while not self._stopping:
+            try:
+                self.reconcile(self.observe())
+            except Exception as e:
+                # Keep the current fleet running if Redis is briefly unreachable
+                print(f"Supervisor error: {e}", flush=True)
+                self._reap()
+            time.sleep(config.SCALE_INTERVAL)
+        self.shutdown()
+
+    def shutdown(self):
+        print(f"Stopping {len(self.workers)} workers...", flush=True)
+        while self.workers:
+            self._drain(self.workers.pop())
+        for process in self.draining:
+            process.wait()
+        self.draining = []
+
+    def _spawn(self):
+        # A separate session keeps terminal Ctrl-C from skipping the graceful drain
+        process = subprocess.Popen([sys.executable, PROCESSOR], start_new_session=True)
+        self.workers.append(process)
+
+    def _drain(self, process):
+        process.send_signal(signal.SIGTERM)
+        self.draining.append(process)
+
+    def _reap(self):
+        for process in self.workers:
+            if process.poll() is not None:
+                print(f"Worker {process.pid} exited with status {process.returncode}", flush=True)
+        self.workers = [p for p in self.workers if p.poll() is None]
+        self.draining = [p for p in self.draining if p.poll() is None]
+
+    def _request_stop(self, signum, frame):
+        self._stopping = True
+
+if __name__ == "__main__":
+    Supervisor(get_redis_client()).run()